@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import json
+import os
+import time
+from collections import OrderedDict
 from functools import partial
 from os.path import abspath, dirname, join
-from typing import Any, Callable, Literal
+from typing import Any, Callable, Literal, NamedTuple, Optional, TextIO, get_args
 
 from anki.decks import DeckId
 from aqt import gui_hooks, mw
@@ -12,20 +16,39 @@ from aqt.qt import (
     QAction,
     QCoreApplication,
     QDialog,
+    QFileSystemWatcher,
+    QImageReader,
     QLabel,
     QKeyEvent,
     QPixmap,
     QSize,
     QSizePolicy,
+    QSocketNotifier,
     QTabWidget,
     Qt,
+    QTimer,
     QVBoxLayout,
     QWidget,
     qconnect,
 )
 from aqt.theme import theme_manager
-from aqt.utils import current_window, tooltip
-from aqt.webview import AnkiWebView
+from aqt.utils import current_window, getSaveFile, showText, tooltip
+from aqt.deckbrowser import DeckBrowser
+from aqt.overview import Overview
+from aqt.reviewer import Reviewer
+from aqt.webview import AnkiWebView, WebContent
+
+from .action_queue import ActionQueue, Pending
+from .evdev import Capabilities, EventDecoder, find_device, read_capabilities, read_state
+from .latency import LatencyRecorder, Sample
+from .protocol import (
+    AXIS_COUNT,
+    axis_speed,
+    changed_bits,
+    decode_axes,
+    decode_buttons,
+    quantized_direction,
+)
 
 assert mw is not None
 
@@ -34,11 +57,33 @@ State = Literal[
     "answer", "dialog", "config", "NoFocus",
 ]
 
+IMPORT_STARTED = time.perf_counter()
 ADDON_PATH = dirname(abspath(__file__))
+IMAGE_CACHE = join(ADDON_PATH, "user_files", "image_cache")
+IMAGE_PREVIEW_WIDTH = 717
 NO_MOD = Qt.KeyboardModifier.NoModifier
+SCROLL_SPEED = 18
+# The Gamepad API only reports the current state, so a press and release that
+# both fall between two samples are never seen: idle polling must stay at or
+# below a short tap. Battery is saved by pausing while Anki is inactive instead.
+POLL_IDLE_MAX = 50
+# Screens where controller input is not acted on, so the backend is paused.
+INACTIVE_STATES = ("NoFocus", "config")
+POLLING_DEFAULTS: dict[str, Any] = {
+    "poll_active_interval": 8,
+    "poll_flush_interval": 50,
+    "poll_idle_intervals": [16, 33, 50],
+    "poll_idle_after": 2000,
+}
 
 CONTROLLER_SCRIPT = """
-let polling, connected_index, indices, ready;
+const AXIS_COUNT = 2;
+const AXIS_THRESHOLD = 0.5;
+const AXIS_SCALE = 127;
+const AXIS_LEVELS = 8;
+let poll_timer, connected_index, indices, ready, previous_buttons, previous_axes, last_timestamp;
+let paused = false, idle_since = 0;
+let pending = [], flush_timer = null, last_flush = -Infinity;
 initialise();
 
 function initialise() {
@@ -56,7 +101,60 @@ function initialise() {
    ready = true;
 }
 
+function schedule_poll(delay) {
+   window.clearTimeout(poll_timer);
+   poll_timer = paused || connected_index == null ? null : setTimeout(poll, delay);
+}
+
+function next_delay(active) {
+   let now = performance.now();
+   if (active) {
+      idle_since = now;
+      return POLLING.active_interval;
+   }
+   let steps = POLLING.idle_intervals;
+   let step = Math.floor((now - idle_since) / POLLING.idle_after);
+   return steps[Math.min(step, steps.length - 1)];
+}
+
+function request_flush() {
+   let wait = last_flush + POLLING.flush_interval - performance.now();
+   if (wait <= 0) {
+      flush();
+   } else if (flush_timer == null) {
+      flush_timer = setTimeout(flush, wait);
+   }
+}
+
+function flush() {
+   window.clearTimeout(flush_timer);
+   flush_timer = null;
+   if (!pending.length) {
+      return;
+   }
+   bridgeCommand(`contanki::batch::${pending.join("::")}`);
+   pending = [];
+   last_flush = performance.now();
+}
+
+function pause_polling() {
+   flush();
+   paused = true;
+   window.clearTimeout(poll_timer);
+   poll_timer = null;
+}
+
+function resume_polling() {
+   if (!paused) {
+      return;
+   }
+   paused = false;
+   idle_since = performance.now();
+   schedule_poll(0);
+}
+
 function on_controller_connect() {
+   paused = false;
    let controllers = window.navigator.getGamepads();
    let register = "contanki::register";
    indices = [];
@@ -75,7 +173,7 @@ function on_controller_connect() {
 }
 
 function connect_controller(i) {
-   window.clearInterval(polling);
+   window.clearTimeout(poll_timer);
    let con = window.navigator.getGamepads()[i];
    if (con == null) {
       bridgeCommand("contanki::message::Could not find controller. Please reconnect your controller.");
@@ -83,14 +181,41 @@ function connect_controller(i) {
    }
    bridgeCommand(`contanki::on_connect::${con.buttons.length}::${con.axes.length}::${con.id}`);
    connected_index = i;
-   setTimeout(() => (polling = setInterval(poll, 50)), 500);
+   setTimeout(() => {
+      sync_state();
+      idle_since = performance.now();
+      schedule_poll(POLLING.active_interval);
+   }, 500);
+}
+
+function sync_state() {
+   let con = window.navigator.getGamepads()[connected_index];
+   if (con == null) {
+      return;
+   }
+   previous_buttons = con.buttons.map((button) => button.pressed);
+   previous_axes = con.axes.slice(0, AXIS_COUNT).map(axis_level);
+   last_timestamp = con.timestamp;
+   let mask = previous_buttons.reduce((packed, pressed, i) => (pressed ? packed + 2 ** i : packed), 0);
+   let axes = con.axes.slice(0, AXIS_COUNT).map((axis) => Math.round(axis * AXIS_SCALE));
+   bridgeCommand(`contanki::poll::${mask.toString(16)}::${axes}`);
 }
 
 function on_controller_disconnect() {
-   window.clearInterval(polling);
+   flush();
+   window.clearTimeout(poll_timer);
+   poll_timer = null;
    connected_index = null;
 }
 
+function axis_direction(value) {
+   return value > AXIS_THRESHOLD ? 1 : value < -AXIS_THRESHOLD ? -1 : 0;
+}
+
+function axis_level(value) {
+   return axis_direction(value) * Math.ceil(Math.abs(value) * AXIS_LEVELS);
+}
+
 function poll() {
    if (connected_index == null) {
       on_controller_disconnect();
@@ -106,10 +231,71 @@ function poll() {
       on_controller_disconnect();
       return;
    }
-   bridgeCommand(`contanki::poll::${con.buttons.map((button) => button.pressed)}::${con.axes}`);
+   let held = previous_buttons.includes(true) || previous_axes.some((level) => level);
+   if (con.timestamp === last_timestamp) {
+      schedule_poll(next_delay(held));
+      return;
+   }
+   last_timestamp = con.timestamp;
+   let button_edges = [];
+   for (let i = 0; i < con.buttons.length; i++) {
+      let pressed = con.buttons[i].pressed;
+      if (pressed !== previous_buttons[i]) {
+         previous_buttons[i] = pressed;
+         button_edges.push(pressed ? `+${i}` : `-${i}`);
+      }
+   }
+   let axis_edges = [];
+   for (let i = 0; i < previous_axes.length; i++) {
+      let level = axis_level(con.axes[i]);
+      if (level !== previous_axes[i]) {
+         previous_axes[i] = level;
+         axis_edges.push(`${i}:${Math.round(con.axes[i] * AXIS_SCALE)}`);
+      }
+   }
+   let changed = button_edges.length || axis_edges.length;
+   if (changed) {
+      let sampled = performance.timeOrigin + performance.now();
+      let input = performance.timeOrigin + con.timestamp;
+      pending.push(`${input}|${sampled}|${button_edges}|${axis_edges}`);
+      request_flush();
+   }
+   held = previous_buttons.includes(true) || previous_axes.some((level) => level);
+   schedule_poll(next_delay(changed || held));
 }
 """
 
+SCROLL_SCRIPT = """
+(() => {
+   if (window.contankiScroll) {
+      return;
+   }
+   let target = 0, current = 0, frame = null;
+   const step = () => {
+      if (!target) {
+         frame = null;
+         current = 0;
+         return;
+      }
+      current += (target - current) * 0.18;
+      if (Math.abs(target - current) < 0.2) {
+         current = target;
+      }
+      window.scrollBy(0, current);
+      frame = window.requestAnimationFrame(step);
+   };
+   window.contankiScroll = (velocity) => {
+      if (Math.sign(velocity) !== Math.sign(target)) {
+         current = 0;
+      }
+      target = velocity;
+      if (target && !frame) {
+         frame = window.requestAnimationFrame(step);
+      }
+   };
+})();
+"""
+
 BINDINGS: dict[tuple[State, int], str] = {
     ("deckBrowser", 0): "Previous Due Deck",
     ("deckBrowser", 1): "Select",
@@ -138,6 +324,41 @@ BINDINGS: dict[tuple[State, int], str] = {
 }
 
 
+def get_config() -> dict[str, Any]:
+    return mw.addonManager.getConfig(__name__) or {}
+
+
+def polling_config() -> dict[str, Any]:
+    """Return the scheduler settings in the shape the controller page expects."""
+    config = get_config()
+    values = {key: config.get(key, default) for key, default in POLLING_DEFAULTS.items()}
+    return {
+        "active_interval": max(1, int(values["poll_active_interval"])),
+        "flush_interval": max(0, int(values["poll_flush_interval"])),
+        "idle_intervals": [min(POLL_IDLE_MAX, max(1, int(v))) for v in values["poll_idle_intervals"]]
+        or POLLING_DEFAULTS["poll_idle_intervals"],
+        "idle_after": max(1, int(values["poll_idle_after"])),
+    }
+
+
+class RepeatSettings(NamedTuple):
+    delay: int
+    interval: int
+    acceleration: float
+    min_interval: int
+    actions: frozenset[str]
+
+
+def repeat_config(config: dict[str, Any]) -> RepeatSettings:
+    return RepeatSettings(
+        delay=max(1, int(config.get("repeat_delay", 400))),
+        interval=max(1, int(config.get("repeat_interval", 150))),
+        acceleration=min(1.0, max(0.1, float(config.get("repeat_acceleration", 0.85)))),
+        min_interval=max(1, int(config.get("repeat_min_interval", 40))),
+        actions=frozenset(config.get("repeat_actions", ())),
+    )
+
+
 def get_state() -> State:
     if (focus := current_window()) is None:
         return "NoFocus"
@@ -151,14 +372,6 @@ def get_state() -> State:
     return "NoFocus"
 
 
-def action_for(state: State, button: int) -> str:
-    fallbacks = (state, "review", "all") if state in ("question", "answer") else (state, "all")
-    for key in fallbacks:
-        if action := BINDINGS.get((key, button)):
-            return action
-    return ""
-
-
 def key_press(key: Qt.Key, mod=NO_MOD) -> None:
     for evt_type in (QKeyEvent.Type.KeyPress, QKeyEvent.Type.KeyRelease):
         QCoreApplication.sendEvent(mw.app.focusObject(), QKeyEvent(evt_type, key, mod))
@@ -215,24 +428,70 @@ def deck_rows() -> tuple[list[DeckId], list[bool]]:
     return list(decks), list(dues)
 
 
-def choose_deck(direction: bool) -> None:
-    step = 1 if direction else -1
+class DueDeckIndex:
+    """Visible decks in display order with precomputed steps to the next due deck.
 
-    def choose(current_deck: DeckId | str) -> None:
+    Rebuilt lazily from deck_rows() after anything that can change the deck
+    list, its collapsed state or due counts, so stepping is O(1) per press.
+    """
+
+    def __init__(self) -> None:
+        self.valid = False
+        self.decks: list[DeckId] = []
+        self.position: dict[DeckId, int] = {}
+        self.next_due: list[int] = []
+        self.prev_due: list[int] = []
+
+    def invalidate(self, *_: Any) -> None:
+        self.valid = False
+
+    def rebuild(self) -> None:
         decks, dues = deck_rows()
-        if not decks or not any(dues):
-            return
+        count = len(decks)
+        next_due, prev_due = [-1] * count, [-1] * count
+        nearest = -1
+        for i in range(2 * count - 1, -1, -1):
+            if i < count:
+                next_due[i] = nearest
+            if dues[i % count]:
+                nearest = i % count
+        nearest = -1
+        for i in range(2 * count):
+            if i >= count:
+                prev_due[i - count] = nearest
+            if dues[i % count]:
+                nearest = i % count
+        self.decks, self.next_due, self.prev_due = decks, next_due, prev_due
+        self.position = {did: i for i, did in enumerate(decks)}
+        self.valid = True
+
+    def step(self, current: DeckId | None, forward: bool) -> DeckId | None:
+        """Return the next (or previous) due deck after ``current``, if any is due."""
+        if not self.valid:
+            self.rebuild()
+        if not self.decks:
+            return None
+        index = self.position.get(current, -1) if current is not None else -1
+        if index < 0:
+            index = len(self.decks) - 1 if forward else 0
+        target = (self.next_due if forward else self.prev_due)[index]
+        return self.decks[target] if target >= 0 else None
+
+
+DUE_DECKS = DueDeckIndex()
+
+
+def choose_deck(direction: bool) -> None:
+    def choose(current_deck: DeckId | str) -> None:
         current = DeckId(int(current_deck)) if current_deck else None
-        index = decks.index(current) if current in decks else (-1 if direction else 0)
-        index = (index + step) % len(decks)
-        while not dues[index]:
-            index = (index + step) % len(decks)
+        if (deck := DUE_DECKS.step(current, direction)) is None:
+            return
         if mw.state == "deckBrowser":
             mw.web.eval(
-                f"document.getElementById({decks[index]}).getElementsByClassName('deck')[0].focus()"
+                f"document.getElementById({deck}).getElementsByClassName('deck')[0].focus()"
             )
         elif mw.col is not None:
-            mw.col.decks.select(decks[index])
+            mw.col.decks.select(deck)
             mw.moveToState("overview")
 
     mw.web.setFocus()
@@ -271,6 +530,61 @@ BUTTON_ACTIONS: dict[str, Callable[[], Any]] = {
 }
 
 
+HOLD_ACTIONS = ("Scroll Up Smooth", "Scroll Down Smooth")
+Handler = Optional[Callable[[], Any]]
+
+
+class Dispatch(NamedTuple):
+    """Per-state tables indexed by button, with fallback states already resolved."""
+
+    names: dict[State, list[str]]
+    press: dict[State, list[Handler]]
+    release: dict[State, list[Handler]]
+
+
+def load_bindings(config: dict[str, Any]) -> dict[tuple[State, int], str]:
+    """Read ``{"state": {"button": "action"}}`` bindings, falling back to BINDINGS."""
+    raw = config.get("bindings")
+    if not isinstance(raw, dict):
+        return dict(BINDINGS)
+    states = get_args(State)
+    bindings: dict[tuple[State, int], str] = {}
+    for state, buttons in raw.items():
+        if state not in states or not isinstance(buttons, dict):
+            continue
+        for button, action in buttons.items():
+            try:
+                index = int(button)
+            except ValueError:
+                continue
+            if action and index >= 0:
+                bindings[(state, index)] = str(action)
+    return bindings
+
+
+def compile_bindings(
+    bindings: dict[tuple[State, int], str],
+    press_actions: dict[str, Callable[[], Any]],
+    release_actions: dict[str, Callable[[], Any]],
+) -> Dispatch:
+    size = max((button for _, button in bindings), default=-1) + 1
+    names: dict[State, list[str]] = {}
+    for state in get_args(State):
+        fallbacks = (state, "review", "all") if state in ("question", "answer") else (state, "all")
+        row = [""] * size
+        for button in range(size):
+            for key in fallbacks:
+                if action := bindings.get((key, button)):
+                    row[button] = action
+                    break
+        names[state] = row
+    return Dispatch(
+        names,
+        {state: [press_actions.get(a) if a else None for a in row] for state, row in names.items()},
+        {state: [release_actions.get(a) if a else None for a in row] for state, row in names.items()},
+    )
+
+
 class ContankiConfig(QDialog):
     def __init__(self, parent: QWidget, contanki) -> None:
         super().__init__(parent)
@@ -305,41 +619,123 @@ class ContankiConfig(QDialog):
     def closeEvent(self, event) -> None:  # noqa: D401
         if getattr(self.contanki, "config_window", None) is self:
             self.contanki.config_window = None
+        LAYOUT_IMAGES.release_sources()
         super().closeEvent(event)
 
 
+class LayoutImages:
+    """Scaled layout pictures for the config dialog.
+
+    The PNGs are only decoded when a tab first needs them. A downscaled
+    preview per device pixel ratio is written once to ``user_files`` and used
+    whenever the dialog is no wider than the default, so later opens skip the
+    full decode. Smoothly scaled results are kept in a small LRU keyed by
+    image, size and device pixel ratio.
+    """
+
+    def __init__(self, limit: int = 6) -> None:
+        self.limit = limit
+        self.scaled: OrderedDict[tuple[str, int, int, float], QPixmap] = OrderedDict()
+        self.sources: dict[tuple[str, int], QPixmap] = {}
+        self.sizes: dict[str, QSize] = {}
+
+    def size(self, name: str) -> QSize:
+        """Return the image size read from the file header, without decoding it."""
+        if (size := self.sizes.get(name)) is None:
+            size = self.sizes[name] = QImageReader(join(ADDON_PATH, "Image", name)).size()
+        return size
+
+    def source(self, name: str, width: int, ratio: float) -> QPixmap:
+        """Return the smallest decoded variant at least ``width`` device pixels wide."""
+        full = self.size(name).width()
+        preview = min(full, round(IMAGE_PREVIEW_WIDTH * ratio))
+        variant = preview if width <= preview else full
+        if (pixmap := self.sources.get((name, variant))) is not None:
+            return pixmap
+        path = join(ADDON_PATH, "Image", name)
+        if variant == full:
+            pixmap = QPixmap(path)
+        else:
+            cached = join(IMAGE_CACHE, f"{os.path.splitext(name)[0].strip()}-{variant}.png")
+            if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+                pixmap = QPixmap(cached)
+            else:
+                pixmap = self.source(name, full, ratio).scaledToWidth(
+                    variant, Qt.TransformationMode.SmoothTransformation
+                )
+                os.makedirs(IMAGE_CACHE, exist_ok=True)
+                pixmap.save(cached, "PNG")
+        self.sources[(name, variant)] = pixmap
+        return pixmap
+
+    def get(self, name: str, size: QSize, ratio: float, smooth: bool) -> QPixmap:
+        key = (name, size.width(), size.height(), ratio)
+        if (pixmap := self.scaled.get(key)) is not None:
+            self.scaled.move_to_end(key)
+            return pixmap
+        pixmap = self.source(name, size.width(), ratio).scaled(
+            size,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+            if smooth
+            else Qt.TransformationMode.FastTransformation,
+        )
+        pixmap.setDevicePixelRatio(ratio)
+        if smooth:
+            self.scaled[key] = pixmap
+            if len(self.scaled) > self.limit:
+                self.scaled.popitem(last=False)
+        return pixmap
+
+    def release_sources(self) -> None:
+        """Drop decoded sources once the dialog closes; scaled results stay cached."""
+        self.sources.clear()
+
+
+LAYOUT_IMAGES = LayoutImages()
+
+
 class ImageTab(QWidget):
     def __init__(self, image_name: str) -> None:
         super().__init__()
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.pixmap = QPixmap(join(ADDON_PATH, "Image", image_name))
+        self.image_name = image_name
+        self.image_size = LAYOUT_IMAGES.size(image_name)
         self.label = QLabel(self)
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.setMinimumSize(520, round(520 * self.pixmap.height() / self.pixmap.width()))
-        self.update_image()
+        self.smooth_timer = QTimer(self)
+        self.smooth_timer.setSingleShot(True)
+        qconnect(self.smooth_timer.timeout, self.update_image)
+        self.setMinimumSize(520, round(520 * self.image_size.height() / self.image_size.width()))
 
     def sizeHint(self) -> QSize:  # noqa: D401
-        return QSize(717, round(717 * self.pixmap.height() / self.pixmap.width()))
+        return QSize(
+            IMAGE_PREVIEW_WIDTH,
+            round(IMAGE_PREVIEW_WIDTH * self.image_size.height() / self.image_size.width()),
+        )
 
-    def resizeEvent(self, event) -> None:  # noqa: D401
+    def showEvent(self, event) -> None:  # noqa: D401
         self.update_image()
+        super().showEvent(event)
+
+    def resizeEvent(self, event) -> None:  # noqa: D401
+        if self.isVisible():
+            self.update_image(smooth=False)
+            self.smooth_timer.start(150)
         super().resizeEvent(event)
 
-    def update_image(self) -> None:
+    def update_image(self, smooth: bool = True) -> None:
         ratio = max(1.0, self.devicePixelRatioF())
         size = lambda w, h: QSize(max(1, round(w)), max(1, round(h)))  # noqa: E731
-        source = size(self.pixmap.width() / ratio, self.pixmap.height() / ratio)
+        source = size(self.image_size.width() / ratio, self.image_size.height() / ratio)
         target = (
             source.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
             if self.width() < source.width() or self.height() < source.height()
             else source
         )
-        scaled = self.pixmap.scaled(
-            size(target.width() * ratio, target.height() * ratio),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation,
+        scaled = LAYOUT_IMAGES.get(
+            self.image_name, size(target.width() * ratio, target.height() * ratio), ratio, smooth
         )
-        scaled.setDevicePixelRatio(ratio)
         self.label.setPixmap(scaled)
         self.label.setGeometry(
             (self.width() - target.width()) // 2,
@@ -349,34 +745,294 @@ class ImageTab(QWidget):
         )
 
 
-class Contanki(AnkiWebView):
+class WebviewBackend(AnkiWebView):
+    """Reads the pad through navigator.getGamepads() in a hidden page."""
+
     def __init__(self, parent) -> None:
         super().__init__(parent=parent)
+        self.setFixedSize(0, 0)
+
+    def start(self) -> None:
+        polling = json.dumps(polling_config())
+        self.stdHtml(
+            f"""<script type="text/javascript">\nlet POLLING = {polling};\n{CONTROLLER_SCRIPT}\n</script>"""
+        )
+
+    def stop(self) -> None:
+        self.stdHtml("")
+
+    def pause(self) -> None:
+        self.eval("window.pause_polling && pause_polling();")
+
+    def resume(self) -> None:
+        self.eval("window.resume_polling && resume_polling();")
+
+    def configure(self) -> None:
+        self.eval(f"POLLING = {json.dumps(polling_config())};")
+
+    def connect_controller(self, index: int) -> None:
+        self._evalWithCallback(f"connect_controller(indices[{index}]);", None)  # type: ignore
+
+
+class EvdevBackend:
+    """Reads the pad straight from its evdev node; no page, no polling.
+
+    Works on any file of ``input_event`` records, so a recorded stream or a
+    fake device file can stand in for the real pad.
+    """
+
+    def __init__(
+        self, contanki: Contanki, path: str, name: str, capabilities: Capabilities | None = None
+    ) -> None:
+        self.contanki = contanki
+        self.path = path
+        self.name = name
+        self.capabilities = capabilities
+        self.fd: int | None = None
+        self.notifier: QSocketNotifier | None = None
+
+    def start(self) -> None:
+        if self.fd is not None:
+            return
+        self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        capabilities = self.capabilities
+        if capabilities is None:
+            try:
+                capabilities = read_capabilities(self.fd)
+            except OSError:
+                capabilities = Capabilities.default()
+        fd = self.fd
+        self.decoder = EventDecoder(capabilities, lambda: read_state(fd, capabilities))
+        if self.decoder.button_count == 0:
+            self.stop()
+            raise OSError(f"{self.path} has no gamepad buttons")
+        self.notifier = QSocketNotifier(self.fd, QSocketNotifier.Type.Read)
+        qconnect(self.notifier.activated, self.on_readable)
+        self.contanki.handle_message(
+            f"contanki::on_connect::{self.decoder.button_count}::{self.decoder.axis_count}::{self.name}"
+        )
+
+    def stop(self) -> None:
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+            self.notifier = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def pause(self) -> None:
+        """Nothing polls here, so keep delivering edges: releases made while
+        Anki is unfocused must still reach Contanki."""
+
+    def resume(self) -> None:
+        pass
+
+    def configure(self) -> None:
+        pass
+
+    def on_readable(self, *_: Any) -> None:
+        try:
+            data = os.read(self.fd, 64 * 24) if self.fd is not None else b""
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.stop()
+            self.contanki.reset_controller()
+            return
+        sampled = time.time() * 1000
+        for buttons, axes, input_time in self.decoder.feed(data):
+            self.contanki.handle_message(
+                f"contanki::edges::{buttons}::{axes}::{input_time}::{sampled}"
+            )
+
+
+class Contanki:
+    def __init__(self) -> None:
+        self.backend: WebviewBackend | EvdevBackend | None = None
         self.connected = False
         self.config_window = None
-        self.buttons: list[bool] = []
-        self.axes: list[bool] = []
+        self.button_mask = 0
+        self.axes: list[int] = []
         self.len_buttons = 0
         self.len_axes = 0
         self.scroll_up = False
         self.scroll_down = False
+        self.analog = 1.0
+        self.device_watcher: QFileSystemWatcher | None = None
+        self.startup: dict[str, float] = {}
+        config = get_config()
+        self.dispatch = self.compile_dispatch(config)
+        self.debug_state = bool(config.get("debug_state_cache", False))
+        self.repeat = repeat_config(config)
+        self.repeat_timer = QTimer(mw)
+        self.repeat_timer.setSingleShot(True)
+        qconnect(self.repeat_timer.timeout, self.on_repeat)
+        self.repeating: tuple[State, int, Callable[[], Any]] | None = None
+        # button -> release handler of a held action, from the screen it was pressed on
+        self.held: dict[int, Callable[[], Any]] = {}
+        self.repeat_interval = 0
+        self.state: State = "NoFocus"
+        self.latency = LatencyRecorder()
+        self.actions = ActionQueue(self.release_held, QTimer.singleShot, lambda: self.state)
+        self.recording: TextIO | None = None
+        self.handlers: dict[str, Callable[..., Any]] = {
+            "message": lambda *a: tooltip("::".join(a)),
+            "register": self.register_controllers,
+            "on_connect": self.on_connect,
+            "poll": self.poll,
+            "edges": self.apply_edges,
+            "batch": self.apply_batch,
+            "on_disconnect": lambda *a: self.reset_controller(),
+        }
+        self.input_at = self.sampled_at = self.received_at = 0.0
 
         mw.addonManager.setConfigAction(__name__, self.on_config)
+        mw.addonManager.setConfigUpdatedAction(__name__, self.on_config_updated)
         self.menu_item = QAction("Controller Layout", mw)
         qconnect(self.menu_item.triggered, self.on_config)
+        self.latency_item = QAction("Controller Latency Report", mw)
+        qconnect(self.latency_item.triggered, self.show_latency_report)
+        self.latency_export_item = QAction("Export Controller Latency…", mw)
+        qconnect(self.latency_export_item.triggered, self.export_latency)
+        self.record_item = QAction("Record Controller Session", mw)
+        self.record_item.setCheckable(True)
+        qconnect(self.record_item.toggled, self.set_recording)
         gui_hooks.webview_did_receive_js_message.append(self.on_receive_message)
-        gui_hooks.profile_will_close.append(lambda: self.stdHtml(""))
+        gui_hooks.webview_will_set_content.append(self.on_webview_will_set_content)
+        gui_hooks.profile_will_close.append(self.suspend)
         gui_hooks.profile_did_open.append(self.resume)
-        self.resume()
-        self.setFixedSize(0, 0)
+        qconnect(mw.app.applicationStateChanged, self.on_application_state)
+        gui_hooks.state_did_change.append(lambda *_: self.refresh_state())
+        gui_hooks.reviewer_did_show_question.append(lambda *_: self.refresh_state())
+        gui_hooks.reviewer_did_show_answer.append(lambda *_: self.refresh_state())
+        qconnect(mw.app.focusChanged, lambda *_: self.refresh_state())
+        gui_hooks.state_did_change.append(self.actions.ready)
+        gui_hooks.reviewer_did_show_question.append(self.actions.ready)
+        gui_hooks.reviewer_did_show_answer.append(self.actions.ready)
+        gui_hooks.operation_did_execute.append(DUE_DECKS.invalidate)
+        gui_hooks.deck_browser_did_render.append(DUE_DECKS.invalidate)
+        gui_hooks.sync_did_finish.append(DUE_DECKS.invalidate)
+        gui_hooks.profile_did_open.append(DUE_DECKS.invalidate)
 
     @staticmethod
     def _is_micro(controller_id: str) -> bool:
         cid = controller_id.lower()
         return "8bitdo" in cid and "micro" in cid
 
+    def create_backend(self) -> WebviewBackend | EvdevBackend:
+        """Prefer reading the evdev node directly, falling back to the webview."""
+        choice = get_config().get("backend", "auto")
+        if choice in ("auto", "evdev") and (device := find_device(self._is_micro)):
+            backend = EvdevBackend(self, *device)
+            try:
+                backend.start()
+                return backend
+            except OSError as err:
+                backend.stop()
+                if choice == "evdev":
+                    tooltip(f"Could not read {device[0]}: {err}")
+        return WebviewBackend(mw)
+
     def resume(self) -> None:
-        self.stdHtml(f"""<script type="text/javascript">\n{CONTROLLER_SCRIPT}\n</script>""")
+        """Start reading the pad; the backend is only created on first profile open."""
+        self.refresh_state()
+        if isinstance(self.backend, EvdevBackend):
+            # The pad may have been unplugged or renumbered since the profile
+            # closed, so look the node up again instead of reopening the old path.
+            self.backend = None
+        if self.backend is None:
+            started = time.perf_counter()
+            self.backend = self.create_backend()
+            self.backend.start()
+            self.startup["backend"] = (time.perf_counter() - started) * 1000
+            self.watch_devices()
+        else:
+            self.backend.start()
+        if self.state in INACTIVE_STATES:
+            self.backend.pause()
+
+    def watch_devices(self) -> None:
+        """Watch /dev/input so a pad plugged in later switches to the evdev backend."""
+        if (
+            self.device_watcher is not None
+            or get_config().get("backend", "auto") == "webview"
+            or not os.path.isdir("/dev/input")
+        ):
+            return
+        self.device_watcher = QFileSystemWatcher(["/dev/input"], mw)
+        # udev fixes up the node's permissions shortly after creating it.
+        qconnect(
+            self.device_watcher.directoryChanged,
+            lambda *_: QTimer.singleShot(500, self.on_devices_changed),
+        )
+
+    def on_devices_changed(self) -> None:
+        if isinstance(self.backend, EvdevBackend) and self.backend.fd is not None:
+            return
+        if mw.pm.profile is None or find_device(self._is_micro) is None:
+            return
+        if self.backend is not None:
+            self.backend.stop()
+            if isinstance(self.backend, WebviewBackend):
+                self.backend.deleteLater()
+            self.backend = None
+        self.resume()
+
+    def suspend(self) -> None:
+        if self.backend is not None:
+            self.backend.stop()
+        self.record_item.setChecked(False)
+        self.reset_controller()
+
+    def on_application_state(self, state: Qt.ApplicationState) -> None:
+        """Stop waking up to poll while Anki is in the background."""
+        if self.backend is None:
+            return
+        if state == Qt.ApplicationState.ApplicationActive:
+            if self.state not in INACTIVE_STATES:
+                self.backend.resume()
+        else:
+            self.backend.pause()
+
+    def compile_dispatch(self, config: dict[str, Any]) -> Dispatch:
+        press = dict(BUTTON_ACTIONS)
+        release = {}
+        for name in HOLD_ACTIONS:
+            press[name] = partial(self.smooth_scroll, name == "Scroll Up Smooth", True)
+            release[name] = partial(self.smooth_scroll, name == "Scroll Up Smooth", False)
+        bindings = load_bindings(config)
+        if unknown := sorted({a for a in bindings.values() if a not in press}):
+            tooltip("Unknown controller actions: " + ", ".join(unknown))
+        return compile_bindings(bindings, press, release)
+
+    def on_config_updated(self, config: dict[str, Any]) -> None:
+        self.dispatch = self.compile_dispatch(config)
+        self.debug_state = bool(config.get("debug_state_cache", False))
+        self.repeat = repeat_config(config)
+        self.stop_repeat()
+        if self.backend is not None:
+            self.backend.configure()
+
+    def refresh_state(self) -> None:
+        """Update the cached state; pause the backend while no Anki screen takes input."""
+        previous, self.state = self.state, get_state()
+        if self.repeating and self.repeating[0] != self.state:
+            self.stop_repeat()
+        inactive = self.state in INACTIVE_STATES
+        if self.backend is not None and inactive != (previous in INACTIVE_STATES):
+            if inactive:
+                self.backend.pause()
+            else:
+                self.backend.resume()
+
+    def current_state(self) -> State:
+        """Return the cached UI state, checking it against get_state() in debug mode."""
+        if self.debug_state and (fresh := get_state()) != self.state:
+            tooltip(f"Contanki: cached state {self.state!r} differs from {fresh!r}")
+            self.state = fresh
+        return self.state
 
     def on_config(self) -> None:
         if focus := current_window():
@@ -387,125 +1043,286 @@ class Contanki(AnkiWebView):
     ) -> tuple[bool, Any]:
         if not message.startswith("contanki"):
             return handled
+        self.handle_message(message)
+        return (True, None)
+
+    def handle_message(self, message: str) -> None:
+        """Handle a ``contanki::<command>::<args>`` message from either backend."""
+        self.received_at = time.time() * 1000
+        if self.recording is not None:
+            self.recording.write(
+                json.dumps({"t": self.received_at, "state": self.state, "message": message}) + "\n"
+            )
         parts = message.split("::")
         if len(parts) < 2:
-            return (True, None)
+            return
         _, func, *args = parts
-        handlers: dict[str, Callable[..., Any]] = {
-            "message": lambda *a: tooltip("::".join(a)),
-            "register": self.register_controllers,
-            "on_connect": self.on_connect,
-            "poll": self.poll,
-            "on_disconnect": lambda *a: self.reset_controller(),
-        }
-        if handler := handlers.get(func):
+        if handler := self.handlers.get(func):
             handler(*args)
-        return (True, None)
 
     def poll(self, input_buttons: str, input_axes: str) -> None:
+        """Apply a packed state snapshot, sent once when the controller connects."""
         if not self.connected:
             return
-        state = get_state()
-        if state in ("NoFocus", "config"):
-            return
-
-        buttons = [b == "true" for b in input_buttons.split(",") if b]
-        axes = [float(a) for a in input_axes.split(",") if a]
-        buttons += [False] * (self.len_buttons - len(buttons))
-        axes += [0.0] * (self.len_axes - len(axes))
-        self.buttons += [False] * (len(buttons) - len(self.buttons))
-        self.axes += [False] * (len(axes) - len(self.axes))
-
-        changed = [(i, v) for i, v in enumerate(buttons) if v != self.buttons[i]]
-        self.buttons = buttons
-        for index, value in changed:
-            self.do_action(state, index, release=not value)
-        if any(axes) or any(self.axes):
-            self.do_axes_actions(state, axes)
-
-    def do_action(self, state: State, button: int, release: bool = False) -> None:
-        action = action_for(state, button)
-        if action in ("Scroll Up Smooth", "Scroll Down Smooth"):
-            self.smooth_scroll(action == "Scroll Up Smooth", not release)
+        state = self.current_state()
+        self.input_at = self.sampled_at = self.received_at
+        mask = decode_buttons(input_buttons)
+        previous, self.button_mask = self.button_mask, mask
+        for index, pressed in changed_bits(previous, mask):
+            self.do_action(state, index, release=not pressed)
+        for axis, value in enumerate(decode_axes(input_axes)[: len(self.axes)]):
+            if quantized_direction(value) != self.axes[axis]:
+                self.do_axis_action(state, axis, value)
+
+    def apply_edges(
+        self,
+        button_edges: str,
+        axis_edges: str,
+        input_time: str | float = "",
+        sample_time: str | float = "",
+    ) -> None:
+        """Apply the button and axis transitions reported by the backend.
+
+        Buttons arrive as ``+index``/``-index`` and axes as ``index:value`` with
+        the quantized value, sent whenever the stick crosses a deflection level,
+        so there is nothing to diff here; an idle controller sends nothing.
+        The page has already moved on, so the held state is updated (and held
+        actions released) even on screens where presses are ignored.
+        """
+        if not self.connected:
             return
+        state = self.current_state()
+        self.sampled_at = float(sample_time or self.received_at)
+        self.input_at = min(float(input_time or self.sampled_at), self.sampled_at)
+        for edge in button_edges.split(","):
+            if edge:
+                index, release = int(edge[1:]), edge[0] == "-"
+                self.button_mask = (
+                    self.button_mask & ~(1 << index) if release else self.button_mask | 1 << index
+                )
+                self.analog = 1.0
+                self.do_action(state, index, release=release)
+        for edge in axis_edges.split(","):
+            if edge:
+                axis, _, value = edge.partition(":")
+                if int(axis) < len(self.axes):
+                    self.do_axis_action(state, int(axis), int(value))
+
+    def apply_batch(self, *entries: str) -> None:
+        """Replay transitions the page buffered between flushes, in the order seen.
+
+        Each entry is ``input time|sample time|button edges|axis edges``; a tap
+        that starts and ends between two flushes arrives as two entries.
+        """
+        for entry in entries:
+            input_time, sample_time, button_edges, axis_edges = entry.split("|")
+            self.apply_edges(button_edges, axis_edges, input_time, sample_time)
+
+    def is_held(self, button: int) -> bool:
+        """Whether the button (or axis direction, for 100+) is down right now."""
+        if button >= 100:
+            axis, positive = divmod(button - 100, 2)
+            return axis < len(self.axes) and self.axes[axis] == (1 if positive else -1)
+        return bool(self.button_mask & (1 << button))
+
+    def do_action(
+        self, state: State, button: int, release: bool = False, repeat: bool = True
+    ) -> None:
+        if self.repeating and (button == self.repeating[1]) == release:
+            self.stop_repeat()
         if release:
+            # Use the handler from the press, which may have been on another screen.
+            if (handler := self.held.pop(button, None)) is not None:
+                try:
+                    handler()
+                except Exception as err:  # pylint: disable=broad-except
+                    tooltip("Error: " + repr(err))
             return
+        if state in INACTIVE_STATES:
+            return
+        handlers = self.dispatch.press[state]
+        if button >= len(handlers) or (handler := handlers[button]) is None:
+            return
+        action = self.dispatch.names[state][button]
+        timing = (self.input_at, self.sampled_at, self.received_at)
+        if self.actions.hold(action, state, button, timing):
+            return
+        self.actions.started(action, state)
+        if (release_handler := self.dispatch.release[state][button]) is not None:
+            self.held[button] = release_handler
+        dispatched = time.time() * 1000
         try:
-            BUTTON_ACTIONS.get(action, BUTTON_ACTIONS[""])()
+            if not self.actions.defer(action, handler):
+                handler()
         except Exception as err:  # pylint: disable=broad-except
             tooltip("Error: " + repr(err))
+        self.latency.record(
+            Sample(
+                action,
+                self.input_at,
+                self.sampled_at,
+                self.received_at,
+                dispatched,
+                time.time() * 1000,
+            )
+        )
+        if repeat and action in self.repeat.actions and self.is_held(button):
+            self.repeating = (state, button, handler)
+            self.repeat_interval = self.repeat.interval
+            self.repeat_timer.start(self.repeat.delay)
+
+    def release_held(self, pending: Pending) -> None:
+        """Dispatch a press the action queue held, resolved against the current (review) state.
+
+        The button may have been let go long ago, so this never starts a repeat.
+        """
+        self.input_at, self.sampled_at, self.received_at = pending.timing
+        self.do_action(self.state, pending.button, repeat=False)
+
+    def on_repeat(self) -> None:
+        """Fire the held action again, shortening the interval each time."""
+        if self.repeating is None or self.repeating[0] != self.state:
+            self.stop_repeat()
+            return
+        state, button, _ = self.repeating
+        action = self.dispatch.names[state][button]
+        if self.actions.blocked(action, state):
+            self.repeat_timer.start(self.repeat_interval)
+            return
+        self.actions.started(action, state)
+        try:
+            self.repeating[2]()
+        except Exception as err:  # pylint: disable=broad-except
+            self.stop_repeat()
+            tooltip("Error: " + repr(err))
+            return
+        self.repeat_timer.start(self.repeat_interval)
+        self.repeat_interval = max(
+            self.repeat.min_interval, round(self.repeat_interval * self.repeat.acceleration)
+        )
 
-    def do_axes_actions(self, state: State, axes: list[float]) -> None:
-        for axis, value in enumerate(axes[:2]):
-            pressed = abs(value) > 0.5
-            if pressed and not self.axes[axis]:
-                self.do_action(state, axis * 2 + int(value > 0) + 100)
-            elif not pressed and self.axes[axis]:
-                self.do_action(state, axis * 2 + 100, release=True)
-                self.do_action(state, axis * 2 + 101, release=True)
-            self.axes[axis] = pressed
+    def stop_repeat(self) -> None:
+        self.repeat_timer.stop()
+        self.repeating = None
+
+    def do_axis_action(self, state: State, axis: int, value: int) -> None:
+        """Release the axis' previous direction and press its new one.
+
+        Deflection changes within the same direction only update held actions
+        such as smooth scrolling, which read their speed from ``self.analog``.
+        """
+        direction = quantized_direction(value)
+        previous = self.axes[axis]
+        self.analog = axis_speed(value)
+        if direction and direction == previous:
+            button = axis * 2 + int(direction > 0) + 100
+            names = self.dispatch.names[state]
+            if button < len(names) and names[button] in HOLD_ACTIONS:
+                self.do_action(state, button)
+            return
+        self.axes[axis] = direction
+        if previous:
+            self.do_action(state, axis * 2 + int(previous > 0) + 100, release=True)
+        if direction:
+            self.do_action(state, axis * 2 + int(direction > 0) + 100)
 
     def on_connect(self, buttons: str | int, axes: str | int, *controller_parts: str) -> None:
         if not self._is_micro("::".join(controller_parts)):
             return
         self.reset_controller()
         self.len_buttons = max(int(buttons), 20)
-        self.len_axes = max(int(axes), 2)
-        self.buttons = [False] * self.len_buttons
-        self.axes = [False] * self.len_axes
+        self.len_axes = max(int(axes), AXIS_COUNT)
+        self.button_mask = 0
+        self.axes = [0] * AXIS_COUNT
+        self.held = {}
         self.connected = True
         mw.form.menuTools.addAction(self.menu_item)
+        mw.form.menuTools.addAction(self.latency_item)
+        mw.form.menuTools.addAction(self.latency_export_item)
+        mw.form.menuTools.addAction(self.record_item)
         tooltip("8BitDo Micro Connected")
 
     def reset_controller(self) -> None:
-        try:
-            mw.form.menuTools.removeAction(self.menu_item)
-        except RuntimeError:
-            pass
-        self.buttons = []
+        for item in (self.menu_item, self.latency_item, self.latency_export_item, self.record_item):
+            try:
+                mw.form.menuTools.removeAction(item)
+            except RuntimeError:
+                pass
+        self.stop_repeat()
+        self.actions.clear()
+        self.button_mask = 0
         self.axes = []
         self.connected = False
 
+    def show_latency_report(self) -> None:
+        polling = polling_config()
+        notes = (
+            f"Polling every {polling['active_interval']} ms while active, backing off through "
+            f"{', '.join(map(str, polling['idle_intervals']))} ms when idle.",
+            "polling: gamepad change to page sample; bridge: page to Python; "
+            "dispatch: Python arrival to action start, including time held in the action "
+            "queue; action: action run time.",
+            self.actions.stats(),
+            self.startup_note(),
+        )
+        showText(
+            self.latency.report_html(notes),
+            parent=mw,
+            type="html",
+            title="Controller Latency",
+            minWidth=760,
+        )
+
+    def startup_note(self) -> str:
+        note = f"Startup: add-on import took {self.startup.get('import', 0):.1f} ms"
+        if "backend" in self.startup:
+            kind = "evdev" if isinstance(self.backend, EvdevBackend) else "webview"
+            note += f"; the {kind} backend took {self.startup['backend']:.1f} ms on profile open"
+        return note + "."
+
+    def export_latency(self) -> None:
+        if path := getSaveFile(
+            mw, "Export Controller Latency", "contanki_latency", "CSV", ".csv", "controller-latency.csv"
+        ):
+            self.latency.write_csv(path)
+            tooltip("Latency samples exported")
+
+    def set_recording(self, enabled: bool) -> None:
+        """Write every bridge message to a session file that ``harness.py`` can replay."""
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
+            tooltip("Controller session saved")
+        if not enabled:
+            return
+        folder = join(ADDON_PATH, "user_files", "recordings")
+        os.makedirs(folder, exist_ok=True)
+        path = join(folder, time.strftime("session-%Y%m%d-%H%M%S.jsonl"))
+        self.recording = open(path, "w", encoding="utf-8")
+        self.recording.write(json.dumps({"config": get_config()}) + "\n")
+        tooltip(f"Recording controller session to {path}")
+
     def register_controllers(self, *controllers: str) -> None:
         for index, controller in enumerate(controllers):
-            if self._is_micro(controller.split("%%%")[0]):
-                self._evalWithCallback(f"connect_controller(indices[{index}]);", None)  # type: ignore
+            if self._is_micro(controller.split("%%%")[0]) and isinstance(
+                self.backend, WebviewBackend
+            ):
+                self.backend.connect_controller(index)
                 return
 
     def smooth_scroll(self, up: bool, active: bool) -> None:
         self.scroll_up, self.scroll_down = (active, False) if up else (False, active)
-        velocity = -18 if self.scroll_up else 18 if self.scroll_down else 0
-        mw.web.eval(
-            f"""
-            (() => {{
-                const targetVelocity = {velocity};
-                if (window.__contankiSmoothScrollTargetVelocity !== targetVelocity) {{
-                    window.__contankiSmoothScrollCurrentVelocity = 0;
-                }}
-                window.__contankiSmoothScrollTargetVelocity = targetVelocity;
-                if (window.__contankiSmoothScrollFrame) {{
-                    return;
-                }}
-                const step = () => {{
-                    const target = window.__contankiSmoothScrollTargetVelocity || 0;
-                    let current = window.__contankiSmoothScrollCurrentVelocity || 0;
-                    if (!target) {{
-                        window.__contankiSmoothScrollFrame = null;
-                        window.__contankiSmoothScrollCurrentVelocity = 0;
-                        return;
-                    }}
-                    current += (target - current) * 0.18;
-                    if (Math.abs(target - current) < 0.2) {{
-                        current = target;
-                    }}
-                    window.__contankiSmoothScrollCurrentVelocity = current;
-                    window.scrollBy(0, current);
-                    window.__contankiSmoothScrollFrame = window.requestAnimationFrame(step);
-                }};
-                window.__contankiSmoothScrollFrame = window.requestAnimationFrame(step);
-            }})();
-            """
-        )
+        speed = round(SCROLL_SPEED * self.analog, 1)
+        velocity = -speed if self.scroll_up else speed if self.scroll_down else 0
+        mw.web.eval(f"window.contankiScroll && contankiScroll({velocity});")
+
+    def on_webview_will_set_content(self, web_content: WebContent, context: object | None) -> None:
+        """Install the scroll engine once per page load of the main webview."""
+        if isinstance(context, (Reviewer, Overview, DeckBrowser)):
+            web_content.head += f"<script>{SCROLL_SCRIPT}</script>"
 
 
-mw.contanki = Contanki(mw)  # type: ignore[attr-defined]
\ No newline at end of file
+mw.contanki = Contanki()  # type: ignore[attr-defined]
+mw.contanki.startup["import"] = (time.perf_counter() - IMPORT_STARTED) * 1000
+if mw.col is not None:  # enabled while a profile is already open
+    mw.contanki.resume()
\ No newline at end of file
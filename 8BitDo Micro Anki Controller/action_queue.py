@@ -0,0 +1,109 @@
+"""Queue between controller input and the reviewer.
+
+Reviewer actions (answering, flipping, undo) are held while the reviewer is
+still switching cards, and released in order once it reports the next side is
+shown. Presses still held when the reviewer is left (e.g. a double press of
+Good on the last card) are dropped rather than run on the next screen. Repeated presses of the same button while held are merged. Long actions
+such as sync are deferred so that input handling returns immediately.
+
+Scheduling is injected, so this module does not depend on Qt or Anki.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable, NamedTuple
+
+REVIEWER_ACTIONS = frozenset(
+    ("Again", "Enter", "Flip Card", "Good", "Show Answer/Answer Good", "Undo")
+)
+LONG_ACTIONS = frozenset(("Rebuild", "Sync"))
+REVIEW_STATES = frozenset(("review", "question", "answer"))
+
+
+class Pending(NamedTuple):
+    button: int
+    queued_at: float
+    timing: tuple[float, ...]
+
+
+class ActionQueue:
+    def __init__(
+        self,
+        release: Callable[[Pending], None],
+        schedule: Callable[[int, Callable[[], Any]], None],
+        state: Callable[[], str],
+        busy_timeout: int = 1500,
+        window: int = 500,
+    ) -> None:
+        self.release = release
+        self.schedule = schedule
+        self.state = state
+        self.busy_timeout = busy_timeout
+        self.busy = False
+        self.generation = 0
+        self.pending: deque[Pending] = deque()
+        self.waits: deque[float] = deque(maxlen=window)
+        self.max_depth = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def blocked(self, action: str, state: str) -> bool:
+        return self.busy and action in REVIEWER_ACTIONS and state in REVIEW_STATES
+
+    def hold(self, action: str, state: str, button: int, timing: tuple[float, ...]) -> bool:
+        """Queue the press if the reviewer is busy; return whether it was held."""
+        if not self.blocked(action, state):
+            return False
+        if any(p.button == button for p in self.pending):
+            self.merged += 1
+            return True
+        self.pending.append(Pending(button, time.perf_counter(), timing))
+        self.max_depth = max(self.max_depth, len(self.pending))
+        return True
+
+    def started(self, action: str, state: str) -> None:
+        """Mark the reviewer busy after a reviewer action runs."""
+        if action in REVIEWER_ACTIONS and state in REVIEW_STATES:
+            self.busy = True
+            self.generation += 1
+            generation = self.generation
+            self.schedule(self.busy_timeout, lambda: self.timed_out(generation))
+
+    def timed_out(self, generation: int) -> None:
+        if self.busy and generation == self.generation:
+            self.ready()
+
+    def ready(self, *_: Any) -> None:
+        """The reviewer has shown the next side; release held presses in order."""
+        self.busy = False
+        if self.pending and self.state() not in REVIEW_STATES:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            return
+        while self.pending and not self.busy:
+            pending = self.pending.popleft()
+            self.waits.append((time.perf_counter() - pending.queued_at) * 1000)
+            self.release(pending)
+
+    def clear(self) -> None:
+        self.pending.clear()
+        self.busy = False
+
+    def defer(self, action: str, handler: Callable[[], Any]) -> bool:
+        """Run long actions after input handling returns; return whether deferred."""
+        if action not in LONG_ACTIONS:
+            return False
+        self.schedule(0, handler)
+        return True
+
+    def stats(self) -> str:
+        waits = sorted(self.waits)
+        median = waits[len(waits) // 2] if waits else 0.0
+        worst = waits[-1] if waits else 0.0
+        return (
+            f"Action queue: {len(self.pending)} waiting now, at most {self.max_depth}; "
+            f"{len(waits)} held presses waited {median:.0f} ms median, {worst:.0f} ms max; "
+            f"{self.merged} duplicate presses merged, {self.dropped} dropped after leaving review."
+        )
@@ -0,0 +1,217 @@
+"""Reading the pad from Linux evdev nodes (``/dev/input/event*``).
+
+The decoder turns raw ``struct input_event`` records into the same edge
+messages the controller page sends, numbering buttons and axes the way the
+kernel's joydev driver (and therefore Chromium's Gamepad API) does, so
+bindings work unchanged with either backend. Nothing here depends on Anki or
+Qt: a recorded event stream or any file of ``input_event`` records can be
+decoded directly.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import sys
+from glob import glob
+from typing import Callable, NamedTuple
+
+from .protocol import AXIS_COUNT, AXIS_SCALE, axis_level
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+EVENT = struct.Struct("llHHi")
+EV_SYN, EV_KEY, EV_ABS = 0x00, 0x01, 0x03
+SYN_REPORT, SYN_DROPPED = 0, 3
+BTN_MISC, BTN_JOYSTICK, BTN_SOUTH, BTN_DIGI = 0x100, 0x120, 0x130, 0x140
+ABS_X, ABS_Y = 0x00, 0x01
+KEY_MAX, ABS_MAX = 0x2FF, 0x3F
+
+# Edge batch: (button edges, axis edges, input time in epoch milliseconds).
+Edges = tuple[str, str, float]
+# Pressed key codes and absolute axis values, as read back from the device.
+State = tuple[set[int], dict[int, int]]
+
+
+class Capabilities(NamedTuple):
+    keys: list[int]
+    axes: dict[int, tuple[int, int]]
+
+    @classmethod
+    def default(cls) -> Capabilities:
+        """Layout assumed when the device can't be queried, e.g. for a plain file."""
+        return cls(list(range(BTN_SOUTH, BTN_SOUTH + 15)), {ABS_X: (-1, 1), ABS_Y: (-1, 1)})
+
+
+def _ioc_read(number: int, size: int) -> int:
+    return (2 << 30) | (size << 16) | (ord("E") << 8) | number
+
+
+def _bits(data: bytes) -> list[int]:
+    return [i for i in range(len(data) * 8) if data[i // 8] >> (i % 8) & 1]
+
+
+def read_capabilities(fd: int) -> Capabilities:
+    """Query supported keys and absolute axes; raises OSError for non-devices."""
+    if fcntl is None:
+        raise OSError("ioctl is not available on this platform")
+    key_bits = bytearray((KEY_MAX + 8) // 8)
+    fcntl.ioctl(fd, _ioc_read(0x20 + EV_KEY, len(key_bits)), key_bits)
+    abs_bits = bytearray((ABS_MAX + 8) // 8)
+    fcntl.ioctl(fd, _ioc_read(0x20 + EV_ABS, len(abs_bits)), abs_bits)
+    axes = {}
+    for code in _bits(abs_bits):
+        info = bytearray(24)
+        fcntl.ioctl(fd, _ioc_read(0x40 + code, len(info)), info)
+        _, minimum, maximum, *_ = struct.unpack("6i", info)
+        axes[code] = (minimum, maximum)
+    return Capabilities([k for k in _bits(key_bits) if k >= BTN_MISC], axes)
+
+
+def read_state(fd: int, capabilities: Capabilities) -> State:
+    """Query the keys held and axis values now (EVIOCGKEY/EVIOCGABS); raises OSError."""
+    if fcntl is None:
+        raise OSError("ioctl is not available on this platform")
+    key_bits = bytearray((KEY_MAX + 8) // 8)
+    fcntl.ioctl(fd, _ioc_read(0x18, len(key_bits)), key_bits)
+    values = {}
+    for code in capabilities.axes:
+        info = bytearray(24)
+        fcntl.ioctl(fd, _ioc_read(0x40 + code, len(info)), info)
+        values[code] = struct.unpack("6i", info)[0]
+    return set(_bits(key_bits)), values
+
+
+def is_gamepad(capabilities: Capabilities) -> bool:
+    """Whether the node has joystick or gamepad buttons (not a pad's keyboard/mouse node)."""
+    return any(BTN_JOYSTICK <= key < BTN_DIGI for key in capabilities.keys)
+
+
+def find_device(match: Callable[[str], bool]) -> tuple[str, str, Capabilities] | None:
+    """Return ``(event node, device name, capabilities)`` of the first readable matching pad.
+
+    Composite pads also expose keyboard and mouse nodes under the same name;
+    those are skipped.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    for name_file in sorted(glob("/sys/class/input/event*/device/name")):
+        try:
+            with open(name_file, encoding="utf-8") as file:
+                name = file.read().strip()
+        except OSError:
+            continue
+        path = "/dev/input/" + name_file.split("/")[4]
+        if not match(name) or not os.access(path, os.R_OK):
+            continue
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            try:
+                capabilities = read_capabilities(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            continue
+        if is_gamepad(capabilities):
+            return path, name, capabilities
+    return None
+
+
+def joydev_order(keys: list[int]) -> list[int]:
+    """Order button codes the way joydev numbers them: BTN_JOYSTICK and up first."""
+    keys = sorted(keys)
+    return [k for k in keys if k >= BTN_JOYSTICK] + [k for k in keys if k < BTN_JOYSTICK]
+
+
+class EventDecoder:
+    """Accumulate ``input_event`` records into edge batches, one per SYN_REPORT.
+
+    After SYN_DROPPED the kernel's queue overflowed, so events up to the next
+    SYN_REPORT are discarded and the device state is read back with
+    ``read_state`` instead; edges are emitted for whatever differs from what was
+    last reported. Without ``read_state`` (a recorded file) held buttons are
+    released and axes centred, so nothing is left stuck.
+    """
+
+    def __init__(
+        self, capabilities: Capabilities, read_state: Callable[[], State] | None = None
+    ) -> None:
+        self.buttons = {code: i for i, code in enumerate(joydev_order(capabilities.keys))}
+        self.axes = {
+            code: (index, limits)
+            for index, (code, limits) in enumerate(sorted(capabilities.axes.items()))
+            if index < AXIS_COUNT
+        }
+        self.button_count = len(self.buttons)
+        self.axis_count = len(capabilities.axes)
+        self.read_state = read_state
+        self.levels = [0] * AXIS_COUNT
+        self.pressed: set[int] = set()
+        self.pending: bytes = b""
+        self.button_edges: list[tuple[int, bool]] = []
+        self.axis_values: dict[int, float] = {}
+        self.dropped = False
+
+    def feed(self, data: bytes) -> list[Edges]:
+        data = self.pending + data
+        usable = len(data) - len(data) % EVENT.size
+        self.pending = data[usable:]
+        batches = []
+        for sec, usec, kind, code, value in EVENT.iter_unpack(data[:usable]):
+            if kind == EV_SYN:
+                if code == SYN_DROPPED:
+                    self.dropped = True
+                elif code == SYN_REPORT:
+                    if self.dropped:
+                        self.button_edges, self.axis_values = self.resync()
+                    if batch := self.flush(sec * 1000 + usec / 1000):
+                        batches.append(batch)
+                    self.dropped = False
+                    self.button_edges, self.axis_values = [], {}
+            elif kind == EV_KEY and code in self.buttons and value != 2:
+                self.button_edges.append((self.buttons[code], bool(value)))
+            elif kind == EV_ABS and code in self.axes:
+                index, limits = self.axes[code]
+                self.axis_values[index] = _scaled(value, limits)
+        return batches
+
+    def resync(self) -> tuple[list[tuple[int, bool]], dict[int, float]]:
+        """The device's current state, as edges against what was last reported."""
+        try:
+            if self.read_state is None:
+                raise OSError("no device to query")
+            keys, values = self.read_state()
+        except OSError:
+            return [(index, False) for index in sorted(self.pressed)], dict.fromkeys(
+                range(AXIS_COUNT), 0.0
+            )
+        buttons = [(index, code in keys) for code, index in self.buttons.items()]
+        axes = {
+            index: _scaled(values[code], limits)
+            for code, (index, limits) in self.axes.items()
+            if code in values
+        }
+        return buttons, axes
+
+    def flush(self, timestamp: float) -> Edges | None:
+        button_edges = []
+        for index, down in self.button_edges:
+            if down != (index in self.pressed):
+                (self.pressed.add if down else self.pressed.discard)(index)
+                button_edges.append(f"{'+' if down else '-'}{index}")
+        axis_edges = []
+        for index, value in sorted(self.axis_values.items()):
+            if (level := axis_level(value)) != self.levels[index]:
+                self.levels[index] = level
+                axis_edges.append(f"{index}:{round(value * AXIS_SCALE)}")
+        if not button_edges and not axis_edges:
+            return None
+        return ",".join(button_edges), ",".join(axis_edges), timestamp
+
+
+def _scaled(value: int, limits: tuple[int, int]) -> float:
+    minimum, maximum = limits
+    return (value - minimum) * 2 / (maximum - minimum or 1) - 1
@@ -0,0 +1,330 @@
+"""Replay recorded controller sessions without Anki or a pad.
+
+Sessions are recorded from Tools > Record Controller Session into
+``user_files/recordings``: a config header line, then one line per bridge
+message with the UI state it arrived in. The replayer loads the add-on against
+stub ``aqt``/``anki`` modules, feeds the messages through
+``Contanki.handle_message`` and reports the actions they produced, dispatch
+throughput and allocations per message::
+
+    python harness.py SESSION.jsonl [--expect ACTIONS.json] [--save ACTIONS.json]
+
+With ``--expect`` the action sequence is compared against a saved one and the
+exit status is nonzero on any difference, so recordings double as regression
+fixtures for message decoding and binding changes.
+
+With ``--simulate`` the recorded messages are not replayed as is. The button
+and axis transitions in them, with their input times, become a scripted pad,
+and the current controller page script samples that pad under node on a fake
+clock. Whatever the page sends is then replayed, so a polling schedule that
+misses transitions fails ``--expect``::
+
+    python harness.py tests/idle_taps.jsonl --simulate --expect tests/idle_taps.expected.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from os.path import abspath, dirname
+from typing import Any
+
+# Runs the controller page against a scripted pad on a fake clock. Reads
+# {"polling", "buttons", "axes", "events": [[t, state_index, pressed, axes]], "end"}
+# from stdin and prints the bridge messages as [[t, message], ...].
+PAGE_DRIVER = r"""
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+let now = 0, pressed = [], axes = new Array(input.axes).fill(0), stamp = 0;
+const timers = [], sent = [];
+global.setTimeout = (f, d) => { const t = {at: now + (d || 0), f}; timers.push(t); return t; };
+global.clearTimeout = (t) => { const i = timers.indexOf(t); if (i >= 0) timers.splice(i, 1); };
+global.performance = {now: () => now, timeOrigin: input.origin};
+global.bridgeCommand = (message) => sent.push([now, message]);
+const pad = {
+   connected: true, id: "8BitDo Micro",
+   get buttons() { return Array.from({length: input.buttons}, (_, i) => ({pressed: pressed.includes(i)})); },
+   get axes() { return axes.slice(); },
+   get timestamp() { return stamp; },
+};
+global.window = {addEventListener() {}, clearTimeout, navigator: {getGamepads: () => [pad]}};
+function run_until(t) {
+   for (;;) {
+      timers.sort((a, b) => a.at - b.at);
+      if (!timers.length || timers[0].at > t) break;
+      const timer = timers.shift();
+      now = timer.at;
+      timer.f();
+   }
+   now = t;
+}
+let POLLING = input.polling;
+eval(input.script + `
+connected_index = 0;
+connect_controller(0);
+for (const [t, , down, levels] of input.events) {
+   run_until(t);
+   pressed = down;
+   axes = levels;
+   stamp = now;
+}
+run_until(input.end);
+flush();
+`);
+process.stdout.write(JSON.stringify(sent));
+"""
+
+STUB_MODULES = (
+    "anki", "anki.decks", "aqt", "aqt.deckbrowser", "aqt.overview", "aqt.qt",
+    "aqt.reviewer", "aqt.theme", "aqt.utils", "aqt.webview",
+)
+
+
+class _StubType(type):
+    def __getattr__(cls, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub()
+
+
+class _Stub(metaclass=_StubType):
+    """Accepts any call or attribute access and does nothing."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _Stub()
+        object.__setattr__(self, name, value)
+        return value
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return _Stub()
+
+    def __iter__(self) -> Any:
+        return iter(())
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = type(name, (_Stub,), {})
+        setattr(self, name, value)
+        return value
+
+
+class _Hooks:
+    def __getattr__(self, name: str) -> list:
+        hook: list = []
+        setattr(self, name, hook)
+        return hook
+
+
+def load_addon(config: dict[str, Any]) -> types.ModuleType:
+    """Import the add-on as package ``contanki`` with Anki replaced by stubs."""
+    for name in STUB_MODULES:
+        sys.modules[name] = _StubModule(name)
+    aqt = sys.modules["aqt"]
+    aqt.mw = _Stub()  # type: ignore[attr-defined]
+    aqt.mw.addonManager.getConfig = lambda _: config
+    aqt.gui_hooks = _Hooks()  # type: ignore[attr-defined]
+    sys.modules["aqt.qt"].qconnect = lambda *_: None  # type: ignore[attr-defined]
+    sys.modules["aqt.utils"].current_window = lambda: None  # type: ignore[attr-defined]
+    sys.modules["anki.decks"].DeckId = int  # type: ignore[attr-defined]
+    folder = dirname(abspath(__file__))
+    spec = importlib.util.spec_from_file_location(
+        "contanki", folder + "/__init__.py", submodule_search_locations=[folder]
+    )
+    assert spec and spec.loader
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules["contanki"] = addon
+    spec.loader.exec_module(addon)
+    return addon
+
+
+def read_session(path: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    with open(path, encoding="utf-8") as file:
+        header, *records = (json.loads(line) for line in file if line.strip())
+    return header["config"], records
+
+
+def pad_events(records: list[dict[str, Any]]) -> list[tuple[float, str, int, bool | int]]:
+    """Return (input time, state, control, pressed or axis value) for every recorded transition.
+
+    control is the button index, or ``-1 - index`` for an axis.
+    """
+    events = []
+    for record in records:
+        _, func, *args = record["message"].split("::")
+        if func == "batch":
+            entries = [entry.split("|") for entry in args]
+        elif func == "edges":
+            buttons, axes, *times = args + ["", ""]
+            entries = [[times[0] or str(record["t"]), "", buttons, axes]]
+        else:
+            continue
+        for input_time, _, buttons, axes in entries:
+            for edge in filter(None, buttons.split(",")):
+                events.append((float(input_time), record["state"], int(edge[1:]), edge[0] == "+"))
+            for edge in filter(None, axes.split(",")):
+                axis, _, value = edge.partition(":")
+                events.append((float(input_time), record["state"], -1 - int(axis), int(value)))
+    return sorted(events, key=lambda event: event[0])
+
+
+def simulate(addon: types.ModuleType, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Feed the recorded transitions to the page script under node; return what it sends."""
+    events = pad_events(records)
+    if not events:
+        return []
+    origin = events[0][0] - 2000  # leave time to connect before the first input
+    states = sorted({state for _, state, _, _ in events})
+    pressed: set[int] = set()
+    levels = [0.0] * addon.AXIS_COUNT
+    timeline = []
+    for input_time, state, control, value in events:
+        if control >= 0:
+            (pressed.add if value else pressed.discard)(control)
+        elif -1 - control < len(levels):
+            levels[-1 - control] = value / 127
+        timeline.append([input_time - origin, states.index(state), sorted(pressed), list(levels)])
+    request = {
+        "script": addon.CONTROLLER_SCRIPT,
+        "polling": addon.polling_config(),
+        "origin": origin,
+        "buttons": 20,
+        "axes": addon.AXIS_COUNT,
+        "events": timeline,
+        "end": timeline[-1][0] + 1000,
+    }
+    result = subprocess.run(
+        ["node", "-e", PAGE_DRIVER], input=json.dumps(request), capture_output=True,
+        text=True, check=True,
+    )
+    replayed = []
+    for sent_at, message in json.loads(result.stdout):
+        if message.split("::")[1] not in ("poll", "edges", "batch"):
+            continue
+        current = [row for row in timeline if row[0] <= sent_at] or timeline[:1]
+        replayed.append(
+            {"t": origin + sent_at, "state": states[current[-1][1]], "message": message}
+        )
+    return replayed
+
+
+class Replay:
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.addon = load_addon(dict(config, backend="webview"))
+        self.contanki = self.addon.mw.contanki
+        self.contanki.actions.schedule = lambda delay, callback: delay or callback()
+        self.log: list[str] = []
+        names = self.contanki.dispatch.names
+        self.contanki.dispatch = self.addon.Dispatch(
+            names, self._logged(self.contanki.dispatch.press, "press"),
+            self._logged(self.contanki.dispatch.release, "release"),
+        )
+
+    def _logged(self, tables: dict[str, list], kind: str) -> dict[str, list]:
+        names = self.contanki.dispatch.names
+        return {
+            state: [
+                None if handler is None
+                else (lambda label=f"{kind} {state}: {names[state][i]}": self.log.append(label))
+                for i, handler in enumerate(handlers)
+            ]
+            for state, handlers in tables.items()
+        }
+
+    def reset(self) -> None:
+        self.log.clear()
+        self.contanki.on_connect(20, self.addon.AXIS_COUNT, "8BitDo Micro")
+
+    def feed(self, record: dict[str, Any]) -> None:
+        self.contanki.state = record["state"]
+        self.contanki.handle_message(record["message"])
+        self.contanki.actions.ready()
+
+    def run(self, records: list[dict[str, Any]]) -> list[str]:
+        self.reset()
+        for record in records:
+            self.feed(record)
+        return list(self.log)
+
+    def throughput(self, records: list[dict[str, Any]], rounds: int = 50) -> float:
+        """Return microseconds per message over repeated replays."""
+        start = time.perf_counter()
+        for _ in range(rounds):
+            self.run(records)
+        return (time.perf_counter() - start) / (rounds * max(len(records), 1)) * 1e6
+
+    def allocations(self, records: list[dict[str, Any]]) -> list[int]:
+        """Return the peak bytes allocated while handling each message."""
+        self.reset()
+        peaks = []
+        tracemalloc.start()
+        for record in records:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            self.feed(record)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        tracemalloc.stop()
+        return peaks
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("session", help="recorded session (.jsonl)")
+    parser.add_argument("--expect", help="fail unless the actions match this file")
+    parser.add_argument("--save", help="write the produced actions to this file")
+    parser.add_argument("--rounds", type=int, default=50, help="replays to time")
+    parser.add_argument(
+        "--simulate", action="store_true",
+        help="re-sample the recorded input with the current page script under node",
+    )
+    args = parser.parse_args(argv)
+
+    config, records = read_session(args.session)
+    replay = Replay(config)
+    if args.simulate:
+        sent = len(pad_events(records))
+        records = simulate(replay.addon, records)
+        seen = len(pad_events(records))
+        print(f"simulated page: {seen} of {sent} transitions sampled")
+    actions = replay.run(records)
+    usec = replay.throughput(records, args.rounds)
+    peaks = sorted(replay.allocations(records)) or [0]
+    print(f"{len(records)} messages, {len(actions)} actions")
+    print(f"dispatch: {usec:.1f} us/message, {1e6 / usec if usec else 0:.0f} messages/s")
+    print(f"allocated: {peaks[len(peaks) // 2]} B median, {peaks[-1]} B max peak per message")
+    for action in actions:
+        print("  " + action)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(actions, file, indent=1)
+    if args.expect:
+        with open(args.expect, encoding="utf-8") as file:
+            expected = json.load(file)
+        if actions != expected:
+            diverged = next(
+                (i for i, pair in enumerate(zip(actions, expected)) if pair[0] != pair[1]),
+                min(len(actions), len(expected)),
+            )
+            print(f"MISMATCH at action {diverged}: expected {expected[diverged:diverged + 3]}, "
+                  f"got {actions[diverged:diverged + 3]}")
+            return 1
+        print("actions match " + args.expect)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Rolling input-latency statistics for controller actions.
+
+Every press is timestamped (epoch milliseconds) at each stage of the pipeline:
+
+* ``input``: when the browser last saw the gamepad change (``Gamepad.timestamp``)
+* ``sampled``: when the controller page polled it
+* ``received``: when the bridge message reached Python
+* ``dispatched``: when the bound action was looked up and started
+* ``completed``: when the action returned
+
+The differences between consecutive stages are kept per action in a bounded
+window, from which percentiles are computed on demand.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+from collections import deque
+from typing import Iterable, NamedTuple
+
+STAGES = ("polling", "bridge", "dispatch", "action", "total")
+PERCENTILES = (50, 90, 99)
+
+
+class Sample(NamedTuple):
+    action: str
+    input: float
+    sampled: float
+    received: float
+    dispatched: float
+    completed: float
+
+    def durations(self) -> tuple[float, ...]:
+        return (
+            self.sampled - self.input,
+            self.received - self.sampled,
+            self.dispatched - self.received,
+            self.completed - self.dispatched,
+            self.completed - self.input,
+        )
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[rank]
+
+
+class LatencyRecorder:
+    def __init__(self, window: int = 500) -> None:
+        self.window = window
+        self.samples: dict[str, deque[Sample]] = {}
+
+    def record(self, sample: Sample) -> None:
+        if (samples := self.samples.get(sample.action)) is None:
+            samples = self.samples[sample.action] = deque(maxlen=self.window)
+        samples.append(sample)
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+    def summary(self) -> dict[str, dict[str, tuple[float, ...]]]:
+        """Return ``{action: {stage: (p50, p90, p99)}}`` over the current window."""
+        result = {}
+        for action, samples in sorted(self.samples.items()):
+            columns = list(zip(*(s.durations() for s in samples)))
+            result[action] = {
+                stage: tuple(percentile(sorted(column), p) for p in PERCENTILES)
+                for stage, column in zip(STAGES, columns)
+            }
+        return result
+
+    def report_html(self, notes: Iterable[str] = ()) -> str:
+        header = "".join(f"<th colspan={len(PERCENTILES)}>{stage}</th>" for stage in STAGES)
+        sub = "".join(f"<th>p{p}</th>" for p in PERCENTILES) * len(STAGES)
+        rows = []
+        for action, stages in self.summary().items():
+            cells = "".join(f"<td>{value:.1f}</td>" for stage in STAGES for value in stages[stage])
+            rows.append(f"<tr><td>{action}</td><td>{len(self.samples[action])}</td>{cells}</tr>")
+        body = "".join(rows) or f"<tr><td colspan={2 + len(STAGES) * len(PERCENTILES)}>No presses recorded yet.</td></tr>"
+        intro = "".join(f"<p>{note}</p>" for note in notes)
+        return (
+            f"{intro}<p>Latency in milliseconds over the last {self.window} presses per action.</p>"
+            "<table border=1 cellpadding=3 style='border-collapse: collapse'>"
+            f"<tr><th rowspan=2>Action</th><th rowspan=2>Presses</th>{header}</tr>"
+            f"<tr>{sub}</tr>{body}</table>"
+        )
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(Sample._fields + tuple(f"{stage}_ms" for stage in STAGES))
+            for samples in self.samples.values():
+                for sample in samples:
+                    writer.writerow(sample + tuple(round(d, 3) for d in sample.durations()))
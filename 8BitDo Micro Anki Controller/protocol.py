@@ -0,0 +1,105 @@
+"""Wire format shared by the controller page and the add-on.
+
+A snapshot is ``<button mask>::<axis values>``: buttons are packed into one
+hexadecimal bitmask (bit ``i`` is button ``i``) and axes are quantized to
+integers in ``[-AXIS_SCALE, AXIS_SCALE]``. This module has no Anki imports so
+the decode path can be benchmarked on its own::
+
+    python protocol.py
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterator
+
+AXIS_COUNT = 2
+AXIS_LEVELS = 8
+AXIS_SCALE = 127
+AXIS_THRESHOLD = 0.5
+QUANTIZED_THRESHOLD = round(AXIS_THRESHOLD * AXIS_SCALE)
+MIN_AXIS_SPEED = 0.15
+
+
+def decode_buttons(text: str) -> int:
+    return int(text, 16) if text else 0
+
+
+def decode_axes(text: str) -> list[int]:
+    return [int(a) for a in text.split(",")] if text else []
+
+
+def axis_direction(value: float) -> int:
+    return 1 if value > AXIS_THRESHOLD else -1 if value < -AXIS_THRESHOLD else 0
+
+
+def axis_level(value: float) -> int:
+    """Signed deflection level; a change of level is what triggers an axis edge."""
+    return axis_direction(value) * math.ceil(abs(value) * AXIS_LEVELS)
+
+
+def quantized_direction(value: int) -> int:
+    return 1 if value > QUANTIZED_THRESHOLD else -1 if value < -QUANTIZED_THRESHOLD else 0
+
+
+def axis_speed(value: int) -> float:
+    """Map a quantized deflection past the threshold to a speed in ``(0, 1]``."""
+    travel = (abs(value) - QUANTIZED_THRESHOLD) / (AXIS_SCALE - QUANTIZED_THRESHOLD)
+    return min(1.0, max(MIN_AXIS_SPEED, travel))
+
+
+def changed_bits(previous: int, current: int) -> Iterator[tuple[int, bool]]:
+    """Yield ``(index, pressed)`` for every button that differs between masks."""
+    changed = previous ^ current
+    while changed:
+        low = changed & -changed
+        yield low.bit_length() - 1, bool(current & low)
+        changed ^= low
+
+
+def _legacy_decode(buttons: str, axes: str, previous: list[bool]) -> tuple[list, list]:
+    pressed = [b == "true" for b in buttons.split(",") if b]
+    values = [float(a) for a in axes.split(",") if a]
+    pressed += [False] * (len(previous) - len(pressed))
+    values += [0.0] * (2 - len(values))
+    changed = [(i, v) for i, v in enumerate(pressed) if v != previous[i]]
+    return changed, [axis_direction(v) for v in values]
+
+
+def _packed_decode(buttons: str, axes: str, previous: int) -> tuple[list, list]:
+    changed = list(changed_bits(previous, decode_buttons(buttons)))
+    return changed, [quantized_direction(v) for v in decode_axes(axes)]
+
+
+def benchmark(rounds: int = 200_000) -> dict[str, tuple[float, int]]:
+    """Return ``{name: (microseconds per decode, peak bytes allocated by a decode)}``."""
+    import timeit
+    import tracemalloc
+
+    state = [i % 5 == 0 for i in range(20)]
+    legacy_args = (
+        ",".join("true" if b else "false" for b in state),
+        "0.0039215686274509665,-1",
+        [False] * 20,
+    )
+    mask = sum(1 << i for i, b in enumerate(state) if b)
+    packed_args = (format(mask, "x"), "0,-127", 0)
+    cases = {
+        "legacy": lambda: _legacy_decode(*legacy_args),
+        "packed": lambda: _packed_decode(*packed_args),
+    }
+    results = {}
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=rounds, repeat=3))
+        tracemalloc.start()
+        for _ in range(1000):
+            case()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = (seconds / rounds * 1e6, peak)
+    return results
+
+
+if __name__ == "__main__":
+    for name, (usec, allocated) in benchmark().items():
+        print(f"{name:>8}: {usec:6.2f} us/poll, {allocated:5d} B peak")
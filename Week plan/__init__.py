@@ -1,62 +1,26 @@
 # __init__.py Connects the add-on to Anki, adds menu actions, and opens the week planner.
 from __future__ import annotations
-import datetime
 from aqt import mw, gui_hooks  # type: ignore
 from aqt.utils import tooltip  # type: ignore
-from .config import get_config as _cfg, save_config as _save_cfg
-
-from .deck_panel import inject_panel, on_js_msg, current_plan_snapshot, _refresh_plan_cache
+from .deck_panel import (
+    inject_panel,
+    on_js_msg,
+    add_decks_to_today,
+    flush_plan,
+    invalidate_deck_catalog,
+    invalidate_study_cache,
+    on_operation_did_execute,
+    on_webview_will_set_content,
+    _refresh_plan_cache,
+)
+from .workload import invalidate_workload, on_operation_did_execute as _workload_on_operation
 DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
 
-# Helper to add a deck to today's plan, handling config shape and de-duplication
-# Helper to add a deck to today's plan, handling config shape and de-duplication
+# Helper to add a deck to today's plan, handling de-duplication
 def _add_deck_to_today(did: int) -> None:
-    today_iso = datetime.date.today().isoformat()
-
-    # Start from canonical snapshot that Week Planner uses
-    try:
-        entries = current_plan_snapshot() or []
-    except Exception:
-        entries = []
-
-    if not isinstance(entries, list):
-        entries = []
-
-    # Compute next order within today, and de-duplicate
-    todays = [e for e in entries if isinstance(e, dict) and e.get("iso") == today_iso]
-    next_order = len(todays)
-    key_set = {
-        (int(e.get("did", -1)), str(e.get("iso", "")))
-        for e in entries
-        if isinstance(e, dict)
-    }
-    key = (int(did), today_iso)
-    if key not in key_set:
-        entries.append({"iso": today_iso, "did": int(did), "order": next_order})
-
-    # Save back using shared helpers
-    try:
-        cfg = _cfg() or {}
-    except Exception:
-        cfg = {}
-    cfg["plan"] = entries
-    try:
-        _save_cfg(cfg)
-    except Exception:
-        pass
-
-    # Refresh Week Planner UI
-    try:
-        if getattr(mw, "deckBrowser", None):
-            mw.deckBrowser.refresh()
-        else:
-            mw.reset()
-    except Exception:
-        try:
-            mw.reset()
-        except Exception:
-            pass
+    # add_decks_to_today saves through the plan store and refreshes the deck browser
+    add_decks_to_today([int(did)])
 
     try:
         tooltip(f"Added to Today: {mw.col.decks.name(did)}")
@@ -77,8 +41,13 @@ def _on_profile_open() -> None:
     # Decks screen panel + JS bridge
     gui_hooks.deck_browser_did_render.append(inject_panel)
     gui_hooks.webview_did_receive_js_message.append(on_js_msg)
+    gui_hooks.operation_did_execute.append(on_operation_did_execute)
+    gui_hooks.operation_did_execute.append(_workload_on_operation)
 
     def _on_sync_finished(*args, **kwargs) -> None:
+        invalidate_deck_catalog()
+        invalidate_workload()
+        invalidate_study_cache()
         try:
             _refresh_plan_cache()
         except Exception:
@@ -89,4 +58,8 @@ def _on_profile_open() -> None:
     # Right-click context menu on deck rows: "Add to Review Today"
 
 
+mw.addonManager.setWebExports(__name__, r"deck_panel_script\.js")
+gui_hooks.webview_will_set_content.append(on_webview_will_set_content)
+gui_hooks.profile_did_open.append(invalidate_deck_catalog)
 gui_hooks.profile_did_open.append(_on_profile_open)
+gui_hooks.profile_will_close.append(flush_plan)
@@ -3,10 +3,11 @@ from typing import Dict, List, Any
 from aqt import mw  # type: ignore
 
 # Default structure for new installs
+# (the plan itself lives in user_files/plan.sqlite3, see deck_panel.py)
 DEFAULTS: Dict[str, Any] = {
-    "plan": [],               # list of {"did": int, "iso": str, "order": int}
-    "include_children": True, # placeholder for future options
-    "wrap_arrows": False      # allow wrap-around navigation buttons
+    "include_children": True, # planning a deck also covers its subdecks
+    "wrap_arrows": False,     # allow wrap-around navigation buttons
+    "debug_timing": False     # tooltip with panel build times after each render
 }
 
 
@@ -1,13 +1,25 @@
 # deck_panel.py , Manages all backend logic for saving, loading, and updating the deck plan data.
 from __future__ import annotations
 from typing import Any, Dict, List, Tuple
+import hashlib
 import json
 import datetime
+import time
+from urllib.parse import quote
 from pathlib import Path
 
+from anki.collection import OpChangesWithId  # type: ignore
+from anki.decks import DeckId  # type: ignore
 from aqt import mw  # type: ignore
-from aqt.utils import showInfo  # type: ignore
+from aqt.operations import CollectionOp  # type: ignore
+from aqt.qt import QTimer  # type: ignore
+from aqt.deckbrowser import DeckBrowser  # type: ignore
+from aqt.utils import showInfo, tooltip  # type: ignore
 from .config import get_config as _cfg, save_config as _save_cfg
+from .deck_tree import deck_hierarchy, invalidate_deck_hierarchy
+from .plan_index import PlanIndex
+from .plan_store import PlanDB, PlanWriter
+from .workload import request_workload
 
 DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 VISIBLE_DAYS = 5
@@ -16,22 +28,31 @@ PlanEntry = Dict[str, Any]
 
 WRAP_ARROWS_DEFAULT = False
 WRAP_ARROWS = WRAP_ARROWS_DEFAULT
+DEBUG_TIMING = False
+INCLUDE_CHILDREN = True
 
 
 _USER_FILES_DIR = Path(__file__).resolve().parent / "user_files"
-_PLAN_FILE = _USER_FILES_DIR / "plan.json"
+_PLAN_DB_FILE = _USER_FILES_DIR / "plan.sqlite3"
+_PLAN_WAL_FILE = _USER_FILES_DIR / "plan.sqlite3-wal"
+_LEGACY_PLAN_FILE = _USER_FILES_DIR / "plan.json"
+_META_FILE = Path(__file__).with_name("meta.json")  # where Anki keeps this add-on's config
 _README_FILE = _USER_FILES_DIR / "README.txt"
 _README_CONTENT = (
     "Week Planner user files\n"
     "=======================\n"
     "\n"
-    "The add-on stores its persistent weekly plan in plan.json inside this\n"
-    "folder. Feel free to back it up or place it under version control.\n"
+    "The add-on stores its plan in plan.sqlite3 inside this folder, one row\n"
+    "per planned deck and day, including past and far-future days. Close\n"
+    "Anki before copying it. A plan.json from older versions is imported\n"
+    "once and kept as plan.json.imported.\n"
 )
 
-def _apply_wrap_from_cfg(cfg: Dict[str, Any]) -> None:
-    """Update the global WRAP_ARROWS flag based on config."""
-    global WRAP_ARROWS
+def _apply_flags_from_cfg(cfg: Dict[str, Any]) -> None:
+    """Update the global WRAP_ARROWS, INCLUDE_CHILDREN and DEBUG_TIMING flags based on config."""
+    global WRAP_ARROWS, INCLUDE_CHILDREN, DEBUG_TIMING
+    DEBUG_TIMING = bool(cfg.get("debug_timing", False))
+    INCLUDE_CHILDREN = bool(cfg.get("include_children", True))
     try:
         WRAP_ARROWS = bool(cfg.get("wrap_arrows", WRAP_ARROWS_DEFAULT))
     except Exception:
@@ -115,28 +136,6 @@ def _canonicalize_plan(entries: List[PlanEntry]) -> Tuple[List[PlanEntry], bool]
             canonical.append({"did": row["did"], "iso": iso, "order": idx})
     return canonical, changed
 
-def _filter_plan_to_current_week(entries: List[PlanEntry]) -> Tuple[List[PlanEntry], bool]:
-    """Drop plan rows that fall outside the five-day window shown in the UI."""
-    visible_isos = set(_visible_iso_window())
-    kept: List[PlanEntry] = []
-    changed = False
-    for row in entries:
-        if not isinstance(row, dict):
-            changed = True
-            continue
-        iso = row.get("iso")
-        if not isinstance(iso, str) or not _valid_iso_date(iso):
-            changed = True
-            continue
-        if iso in visible_isos:
-            kept.append(row)
-        else:
-            changed = True
-    if not changed:
-        return entries, False
-    canonical, _ = _canonicalize_plan(kept)
-    return canonical, True
-
 def _ensure_user_files() -> None:
     try:
         _USER_FILES_DIR.mkdir(parents=True, exist_ok=True)
@@ -148,30 +147,50 @@ def _ensure_user_files() -> None:
     except Exception:
         pass
 
-def _write_plan_to_disk(plan: List[PlanEntry]) -> None:
+_PLAN_DB = PlanDB(_PLAN_DB_FILE)
+_PLAN_WRITER = PlanWriter(_PLAN_DB, QTimer.singleShot)
+
+def _write_plan_to_disk(days: Dict[str, List[int]]) -> None:
+    """Queue a debounced background rewrite of the given days in plan.sqlite3."""
+    _ensure_user_files()
+    _PLAN_WRITER.save(days)
+
+def flush_plan() -> None:
+    """Write any pending plan change now (called on profile close)."""
     try:
-        _ensure_user_files()
-        payload = json.dumps(plan, indent=2)
-        _PLAN_FILE.write_text(payload + "\n", encoding="utf-8")
+        _PLAN_WRITER.flush()
     except Exception:
         pass
 
-def _load_plan_from_disk() -> tuple[List[PlanEntry], bool]:
+def _import_legacy_plan(legacy_plan: Any) -> None:
+    """Seed a new plan.sqlite3 from plan.json (or the old config copy), history included."""
     _ensure_user_files()
-    if not _PLAN_FILE.exists():
-        return ([], False)
+    raw: Any = legacy_plan or []
+    if _LEGACY_PLAN_FILE.exists():
+        try:
+            raw_text = _LEGACY_PLAN_FILE.read_text(encoding="utf-8")
+            raw = json.loads(raw_text) if raw_text.strip() else []
+        except Exception:
+            pass
+    plan, _ = _migrate_plan(raw)
+    _PLAN_DB.import_rows(plan)
     try:
-        raw_text = _PLAN_FILE.read_text(encoding="utf-8")
+        _LEGACY_PLAN_FILE.replace(_LEGACY_PLAN_FILE.with_name("plan.json.imported"))
     except Exception:
-        return ([], False)
+        pass
+
+def _load_plan_from_disk() -> List[PlanEntry]:
+    """Rows for the visible days only; older and later days stay in the database."""
+    _ensure_user_files()
+    isos = _visible_iso_window()
     try:
-        raw = json.loads(raw_text) if raw_text.strip() else []
+        # Only ever seed an empty database: if renaming plan.json failed, a
+        # later import would overwrite newer edits with its stale rows.
+        if _LEGACY_PLAN_FILE.exists() and _PLAN_DB.is_empty():
+            _import_legacy_plan(None)
+        return _PLAN_DB.window(isos[0], isos[-1])
     except Exception:
-        return ([], False)
-    plan, changed = _migrate_plan(raw)
-    if changed:
-        _write_plan_to_disk(plan)
-    return (plan, True)
+        return []
 
 _ensure_user_files()
 
@@ -228,95 +247,188 @@ def _migrate_plan(raw: Any) -> Tuple[List[PlanEntry], bool]:
     canonical, canonical_changed = _canonicalize_plan(entries)
     return canonical, changed or canonical_changed
 
-_PLAN_CACHE: List[PlanEntry] | None = None
-_SCRIPT_CACHE: str | None = None
-
-def _load_script_template() -> str:
-    global _SCRIPT_CACHE
-    if _SCRIPT_CACHE is None:
-        path = Path(__file__).with_name("deck_panel_script.js")
+_PLAN_INDEX: PlanIndex | None = None
+_LOADED_FROM: Tuple[Any, ...] | None = None  # _plan_source_key() when _PLAN_INDEX was read
+_CFG_STAMP: Tuple[int, int] | None = None  # meta.json (mtime_ns, size) last applied
+_CFG_HASH = ""  # content hash of the config last applied
+_SENT_VERSION = -1  # plan version the deck browser page last received
+_DECK_CATALOG: Tuple[str, str] | None = None  # (hash, JSON list of {id, name})
+# filtered deck name -> (planned deck ids, scheduler day, filtered deck id, include_children) of
+# the last build; cleared by any other operation that changes cards or queues, and on sync
+_STUDY_CACHE: Dict[str, Tuple[frozenset, int, int, bool]] = {}
+_STUDY_OP = object()  # initiator of our own filtered deck builds
+
+_SCRIPT_FILE = Path(__file__).with_name("deck_panel_script.js")
+_LAST_INJECT_MS = 0.0
+
+def _script_url() -> str:
+    """URL of the panel runtime as a web export; the mtime busts stale caches."""
+    addon = mw.addonManager.addonFromModule(__name__)
+    try:
+        stamp = int(_SCRIPT_FILE.stat().st_mtime)
+    except OSError:
+        stamp = 0
+    return f"/_addons/{quote(addon)}/{_SCRIPT_FILE.name}?v={stamp}"
+
+def on_webview_will_set_content(web_content: Any, context: Any) -> None:
+    """Load the runtime with the deck browser page, instead of eval'ing it per render."""
+    if isinstance(context, DeckBrowser):
+        web_content.js.append(_script_url())
+
+def _deck_catalog() -> Tuple[str, str]:
+    """Return (hash, JSON) of the regular decks, built once per deck change."""
+    global _DECK_CATALOG
+    if _DECK_CATALOG is None:
         try:
-            _SCRIPT_CACHE = path.read_text(encoding="utf-8")
-        except Exception as exc:
-            raise RuntimeError(f"Week Planner script missing at {path}") from exc
-    return _SCRIPT_CACHE
+            decks = [{"id": d.id, "name": d.name}
+                     for d in mw.col.decks.all_names_and_ids(include_filtered=False)]
+        except Exception:
+            decks = [{"id": d["id"], "name": d["name"]}
+                     for d in mw.col.decks.all() if not d.get("dyn")]
+        payload = json.dumps(decks, separators=(",", ":"))
+        _DECK_CATALOG = (hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16], payload)
+    return _DECK_CATALOG
+
+def invalidate_deck_catalog(*_args: Any) -> None:
+    global _DECK_CATALOG
+    _DECK_CATALOG = None
+    invalidate_deck_hierarchy()
+
+def invalidate_study_cache(*_args: Any) -> None:
+    _STUDY_CACHE.clear()
+
+def on_operation_did_execute(changes: Any, handler: Any) -> None:
+    """Drop the deck catalog when an operation added, renamed or removed decks, and
+    the Study Today cache when one (other than our own build) changed cards or queues."""
+    if getattr(changes, "deck", False):
+        invalidate_deck_catalog()
+    if handler is not _STUDY_OP and (getattr(changes, "card", False)
+                                     or getattr(changes, "study_queues", False)):
+        invalidate_study_cache()
+
+def _file_stamp(path: Path) -> Tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
-def _load_current_plan() -> List[PlanEntry]:
+def _config_hash(cfg: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(cfg, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _sync_config() -> None:
+    """Re-read the config only when meta.json changed, and re-apply it only when its content did."""
+    global _CFG_STAMP, _CFG_HASH
+    stamp = _file_stamp(_META_FILE)
+    if stamp is not None and stamp == _CFG_STAMP:
+        return
     cfg = _cfg()
-    _apply_wrap_from_cfg(cfg)
-    cfg_plan, cfg_changed = _migrate_plan(cfg.get("plan", []))
-    disk_plan, disk_valid = _load_plan_from_disk()
-    if disk_valid:
-        plan, trimmed = _filter_plan_to_current_week(disk_plan)
-        needs_save = trimmed
-        if trimmed:
-            _write_plan_to_disk(plan)
-        if not _plan_rows_equal(cfg_plan, plan) or cfg.get("plan") is None:
-            cfg["plan"] = plan
-            needs_save = True
-        if "wrap_arrows" not in cfg:
-            cfg["wrap_arrows"] = WRAP_ARROWS
-            needs_save = True
-        if needs_save:
-            _save_cfg(cfg)
-        return plan
-    plan, trimmed = _filter_plan_to_current_week(cfg_plan)
-    needs_save = cfg_changed or trimmed
-    if cfg_changed or trimmed:
-        cfg["plan"] = plan
-    if "wrap_arrows" not in cfg:
-        cfg["wrap_arrows"] = WRAP_ARROWS
-        needs_save = True
-    if needs_save:
+    # Older versions kept a second copy of the plan in meta.json; it is only
+    # read to migrate installs that never wrote plan.json, then dropped.
+    legacy_plan = cfg.pop("plan", None)
+    digest = _config_hash(cfg)
+    if legacy_plan is None and digest == _CFG_HASH:
+        _CFG_STAMP = stamp
+        return
+    _apply_flags_from_cfg(cfg)
+    if legacy_plan is not None:
+        try:
+            _ensure_user_files()
+            if _PLAN_DB.is_empty():
+                _import_legacy_plan(legacy_plan)
+        except Exception:
+            pass
         _save_cfg(cfg)
-    _write_plan_to_disk(plan)
-    return plan
+        stamp = _file_stamp(_META_FILE)
+    _CFG_STAMP, _CFG_HASH = stamp, digest
+
+def _plan_source_key() -> Tuple[Any, ...]:
+    """What the loaded window depends on: the day and plan.sqlite3 (WAL commits touch only -wal)."""
+    return (_iso_today(), _file_stamp(_PLAN_DB_FILE), _file_stamp(_PLAN_WAL_FILE))
+
+def _load_current_plan() -> List[PlanEntry]:
+    global _LOADED_FROM
+    _sync_config()
+    if _PLAN_WRITER.dirty and _PLAN_INDEX is not None:
+        # plan.sqlite3 hasn't caught up with the latest edit yet; memory is newer.
+        return _PLAN_INDEX.rows()
+    # Stamp before reading, so a write landing in between triggers another load.
+    _LOADED_FROM = _plan_source_key()
+    return _load_plan_from_disk()
+
+def _plan_index() -> PlanIndex:
+    global _PLAN_INDEX
+    if _PLAN_INDEX is None:
+        _PLAN_INDEX = PlanIndex.from_rows(_load_current_plan())
+    return _PLAN_INDEX
 
 def _get_plan() -> List[PlanEntry]:
-    global _PLAN_CACHE
-    if _PLAN_CACHE is None:
-        cached = _load_current_plan()
-        _PLAN_CACHE = [dict(row) for row in cached]
-    return _PLAN_CACHE
-
-def _refresh_plan_cache() -> List[PlanEntry]:
-    global _PLAN_CACHE
-    cached = _load_current_plan()
-    new_plan = [dict(row) for row in cached]
-    _PLAN_CACHE = new_plan
-    _broadcast_plan_to_web(new_plan)
-    return _PLAN_CACHE
-
-def _broadcast_plan_to_web(plan: List[PlanEntry]) -> None:
+    return _plan_index().rows()
+
+def _refresh_plan_cache(broadcast: bool = True) -> List[PlanEntry]:
+    """Reload the plan if the config, plan.sqlite3 or the day changed; the page only
+    gets a snapshot if the rows did. With nothing changed this is a few stat calls."""
+    global _PLAN_INDEX
+    _sync_config()
+    if _PLAN_INDEX is None or _plan_source_key() != _LOADED_FROM:
+        rows = _load_current_plan()
+        if _PLAN_INDEX is None or not _plan_rows_equal(_PLAN_INDEX.rows(), rows):
+            version = _PLAN_INDEX.version + 1 if _PLAN_INDEX is not None else 0
+            _PLAN_INDEX = PlanIndex.from_rows(rows)
+            _PLAN_INDEX.version = version
+    if broadcast and _SENT_VERSION != _PLAN_INDEX.version:
+        _broadcast_plan_to_web()
+    return _PLAN_INDEX.rows()
+
+def _deck_browser_eval(js: str) -> bool:
     try:
         deck_browser = getattr(mw, "deckBrowser", None)
         web = getattr(deck_browser, "web", None)
     except Exception:
-        return
+        return False
     if not web:
-        return
+        return False
     try:
-        payload = json.dumps(plan)
-        web.eval(f"if (window.WP_setPlan) {{ window.WP_setPlan({payload}); }}")
+        web.eval(js)
     except Exception:
-        pass
+        return False
+    return True
 
-def _save_plan(plan: List[PlanEntry]) -> None:
-    global _PLAN_CACHE
-    if not isinstance(plan, list):
-        plan = [] 
-    canonical, _ = _canonicalize_plan(plan)
-    canonical, _ = _filter_plan_to_current_week(canonical)
-    canonical_copy = [dict(row) for row in canonical]
-    if _plan_rows_equal(_PLAN_CACHE, canonical_copy):
+def _broadcast_plan_to_web() -> None:
+    """Send the full plan; used on reloads and when the page reports a version gap."""
+    global _SENT_VERSION
+    index = _plan_index()
+    index.drain_ops()
+    payload = json.dumps(index.rows())
+    if _deck_browser_eval(f"if (window.WP_setPlan) {{ window.WP_setPlan({payload}, {index.version}); }}"):
+        _SENT_VERSION = index.version
+
+def _broadcast_patch_to_web() -> None:
+    """Send only the ops since the version the page already has."""
+    global _SENT_VERSION
+    index = _plan_index()
+    ops = index.drain_ops()
+    if _SENT_VERSION < 0:
         return
-    _PLAN_CACHE = canonical_copy
-    cfg = _cfg()
-    cfg["plan"] = canonical_copy
-    cfg.setdefault("wrap_arrows", WRAP_ARROWS)
-    _save_cfg(cfg)
-    _write_plan_to_disk(canonical_copy)
-    _broadcast_plan_to_web(canonical_copy)
+    patch = json.dumps({"from": _SENT_VERSION, "to": index.version, "ops": ops})
+    if _deck_browser_eval(f"if (window.WP_applyPatch) {{ window.WP_applyPatch({patch}); }}"):
+        _SENT_VERSION = index.version
+
+def _plan_changed() -> None:
+    """Persist the plan and patch the page after an edit to the index changed it."""
+    index = _plan_index()
+    _write_plan_to_disk(index.drain_touched())
+    _broadcast_patch_to_web()
+    _request_workload()
+
+def _request_workload(tree: Any = None) -> None:
+    """Refresh the per-day due/new/learning overlay for the visible days in the background."""
+    index = _plan_index()
+    isos = _visible_iso_window()
+    planned = {iso: list(index.day(iso)) for iso in isos if index.day(iso)}
+    if planned:
+        request_workload(planned, isos, tree, _deck_browser_eval,
+                         deck_hierarchy(), INCLUDE_CHILDREN)
 
 def current_plan_snapshot() -> List[PlanEntry]:
     """Return a deep copy of the current plan cache for external consumers."""
@@ -325,146 +437,81 @@ def current_plan_snapshot() -> List[PlanEntry]:
 
 def replace_plan_with_week_labels(day_map: Dict[str, List[int]]) -> None:
     """Overwrite plan using a mapping from weekday labels (Mon…) to deck IDs."""
-    plan = list(_get_plan())
+    index = _plan_index()
     base_week = _week_start()
-    target_isos: List[str] = []
-    for day_label in day_map.keys():
-        iso = _weekday_label_to_iso(day_label, base_week)
-        if iso:
-            target_isos.append(iso)
-
-    if target_isos:
-        plan = [entry for entry in plan if entry.get("iso") not in target_isos]
-
+    changed = False
     for day_label, deck_ids in day_map.items():
         iso = _weekday_label_to_iso(day_label, base_week)
         if not iso:
             continue
-        for order, did in enumerate(deck_ids):
-            did_int = _coerce_int(did)
-            if did_int is None:
-                continue
-            plan.append({"did": did_int, "iso": iso, "order": order})
-
-    _save_plan(plan)
-
-def _rebuild_plan_with_move(plan: List[PlanEntry], did: int, from_iso: str | None,
-                            to_iso: str, new_order: int) -> List[PlanEntry]:
-    if not _valid_iso_date(to_iso):
-        return list(plan)
-    from_iso_valid = from_iso if isinstance(from_iso, str) and _valid_iso_date(from_iso) else None
-    try:
-        target_index = int(new_order)
-    except Exception:
-        target_index = 0
-    if target_index < 0:
-        target_index = 0
-
-    per_iso: Dict[str, List[PlanEntry]] = {}
-    for row in plan:
-        if not isinstance(row, dict):
-            continue
-        iso = row.get("iso")
-        row_did = _coerce_int(row.get("did"))
-        if not isinstance(iso, str) or row_did is None or not _valid_iso_date(iso):
-            continue
-        if row_did == did and (iso == to_iso or (from_iso_valid and iso == from_iso_valid)):
-            # skip existing copy for the moving deck
-            continue
-        order_hint = row.get("order")
-        try:
-            order_int = int(order_hint)
-        except Exception:
-            order_int = 0
-        per_iso.setdefault(iso, []).append({"did": row_did, "iso": iso, "order": order_int})
-
-    bucket = per_iso.get(to_iso, [])
-    bucket = sorted(bucket, key=lambda r: (r.get("order", 0), r["did"]))
-    if target_index > len(bucket):
-        target_index = len(bucket)
-    bucket.insert(target_index, {"did": did, "iso": to_iso, "order": target_index})
-    per_iso[to_iso] = bucket
-
-    rebuilt: List[PlanEntry] = []
-    for iso in sorted(per_iso.keys()):
-        rows = per_iso[iso]
-        rows_sorted = sorted(rows, key=lambda r: (r.get("order", 0), r["did"]))
-        for idx, row in enumerate(rows_sorted):
-            rebuilt.append({"did": row["did"], "iso": iso, "order": idx})
-    return rebuilt
-
-def _rebuild_plan_without_entry(plan: List[PlanEntry], did: int, iso: str) -> List[PlanEntry]:
-    if not _valid_iso_date(iso):
-        return list(plan)
-    rebuilt: List[PlanEntry] = []
-    per_iso: Dict[str, List[PlanEntry]] = {}
-    for row in plan:
-        if not isinstance(row, dict):
-            continue
-        row_iso = row.get("iso")
-        row_did = _coerce_int(row.get("did"))
-        if not isinstance(row_iso, str) or row_did is None or not _valid_iso_date(row_iso):
-            continue
-        if row_did == did and row_iso == iso:
-            continue
-        order_hint = row.get("order")
-        try:
-            order_int = int(order_hint)
-        except Exception:
-            order_int = 0
-        per_iso.setdefault(row_iso, []).append({"did": row_did, "iso": row_iso, "order": order_int})
-
-    for iso_key in sorted(per_iso.keys()):
-        rows = sorted(per_iso[iso_key], key=lambda r: (r.get("order", 0), r["did"]))
-        for idx, row in enumerate(rows):
-            rebuilt.append({"did": row["did"], "iso": iso_key, "order": idx})
-    return rebuilt
+        dids = [did for did in (_coerce_int(d) for d in deck_ids) if did is not None]
+        changed = index.set_day(iso, dids) or changed
+    if changed:
+        _plan_changed()
 
 def _study_range(k: int, deck_name: str) -> None:
     """
     Build/refresh a filtered deck using decks planned for the next k days
-    (k=1 => today only). Then select it and jump to Review.
+    (k=1 => today only). Then select it and jump to Review. The rebuild runs
+    as a background collection op.
     """
     wanted = set(_iso_dates_from_today(k))
 
-    plan = _get_plan()
+    index = _plan_index()
 
     # Resolve deck IDs that intersect the window
     deck_ids: set[int] = set()
-    for row in plan:
-        if not isinstance(row, dict):
-            continue
-        iso = row.get("iso")
-        did = _coerce_int(row.get("did"))
-        if did is None or iso not in wanted:
-            continue
-        deck_ids.add(did)
+    for iso in wanted:
+        deck_ids.update(index.day(iso))
 
     if not deck_ids:
         showInfo("No decks scheduled in the selected window.")
         return
 
-    # Resolve names & escape double quotes for search
     col = mw.col
-    names: List[str] = []
-    for did in deck_ids:
-        name = col.decks.name(did)
-        if name:
-            names.append(name.replace('"', '\\"'))
-    if not names:
+    planned = frozenset(did for did in deck_ids if col.decks.get(did, default=False))
+    if not planned:
         showInfo("Scheduled decks were not found.")
         return
 
-    search = "(" + " or ".join(f'deck:"{n}"' for n in names) + ") is:due"
-
-    did = col.decks.id(deck_name)
-    d = col.decks.get(did)
-    d["dyn"] = True
-    col.decks.save(d)
-    col.sched.rebuild_filtered_deck(did, search=search, resched=False, limit=999999)
+    # Same decks, same day and no card or queue change since the last build:
+    # the filtered deck is still current, so just open it. (col.mod can't be
+    # the key: selecting the deck afterwards bumps it.)
+    existing_id = col.decks.id_for_name(deck_name)
+    last = _STUDY_CACHE.get(deck_name)
+    if last and existing_id == last[2] and last[:2] == (planned, col.sched.today) and last[3] == INCLUDE_CHILDREN:
+        _open_filtered_deck(existing_id)
+        return
+    if existing_id and not col.decks.is_filtered(existing_id):
+        showInfo(f'"{deck_name}" is a regular deck; rename it to use Study Today.')
+        return
 
-    mw.col.decks.select(did)
-    mw.reset()
+    # Search by id so names need no quoting and the search stays short;
+    # subdecks come from the shared hierarchy when include_children is on.
+    search_ids = deck_hierarchy().expand(planned, INCLUDE_CHILDREN)
+    search = f"did:{','.join(str(did) for did in sorted(search_ids))} is:due"
+
+    def build(col) -> OpChangesWithId:
+        deck = col.sched.get_or_create_filtered_deck(deck_id=DeckId(existing_id or 0))
+        deck.name = deck_name
+        deck.config.reschedule = False
+        term = deck.config.search_terms[0]
+        term.search = search
+        term.limit = 999999
+        # A new filtered deck also gets a second "deck:current is:new" term;
+        # drop it like the filtered deck dialog does when filter 2 is off.
+        del deck.config.search_terms[1:]
+        return col.sched.add_or_update_filtered_deck(deck)
+
+    def on_success(changes: OpChangesWithId) -> None:
+        _STUDY_CACHE[deck_name] = (planned, mw.col.sched.today, changes.id, INCLUDE_CHILDREN)
+        _open_filtered_deck(changes.id)
+
+    CollectionOp(parent=mw, op=build).success(on_success).run_in_background(initiator=_STUDY_OP)
+
+def _open_filtered_deck(did: int) -> None:
+    """Select the filtered deck and go to the reviewer; the op already refreshed the rest."""
+    mw.col.decks.select(DeckId(did))
     try:
         mw.moveToState("review")
     except Exception:
@@ -496,23 +543,29 @@ def _open_deck_from_planner(did: int) -> None:
             pass
 
 def inject_panel(deck_browser) -> None:
-    plan = _refresh_plan_cache()
-    decks = [{"id": d["id"], "name": d["name"]}
-             for d in mw.col.decks.all() if not d.get("dyn")]
-
-    plan_js = json.dumps(plan)
-    decks_js = json.dumps(decks)
-    today_js = json.dumps(_iso_today())
-    wrap_js = "true" if WRAP_ARROWS else "false"
-    script_template = _load_script_template()
-    script = (script_template
-              .replace("__PLAN_JSON__", plan_js)
-              .replace("__DECKS_JSON__", decks_js)
-              .replace("__TODAY_ISO__", today_js)
-              .replace("__WRAP_ARROWS__", wrap_js))
-
-    deck_browser.web.eval(script)
-    _broadcast_plan_to_web(plan)
+    global _SENT_VERSION, _LAST_INJECT_MS
+    started = time.perf_counter()
+    plan = _refresh_plan_cache(broadcast=False)
+    index = _plan_index()
+    index.drain_ops()
+    decks_hash, _ = _deck_catalog()
+    data = json.dumps({
+        "plan": plan,
+        "version": index.version,
+        "decksHash": decks_hash,
+        "today": _iso_today(),
+        "wrapArrows": WRAP_ARROWS,
+        "includeChildren": INCLUDE_CHILDREN,
+        "timing": DEBUG_TIMING,
+    })
+    deck_browser.web.eval(f"if (window.WP_init) {{ window.WP_init({data}); }}")
+    _SENT_VERSION = index.version
+    _LAST_INJECT_MS = (time.perf_counter() - started) * 1000
+    # The deck browser has just computed deck_due_tree for its own render; reuse it.
+    # Current versions keep it in _render_data.tree, older ones in _dueTree.
+    render_data = getattr(deck_browser, "_render_data", None)
+    tree = getattr(render_data, "tree", None) or getattr(deck_browser, "_dueTree", None)
+    _request_workload(tree)
 
 def on_js_msg(*args):
     """
@@ -554,9 +607,8 @@ def on_js_msg(*args):
                 order_int = int(order_s)
             except Exception:
                 order_int = 0
-            plan = _get_plan()
-            next_plan = _rebuild_plan_with_move(plan, did, from_iso or None, to_iso, order_int)
-            _save_plan(next_plan)
+            if _plan_index().move(did, from_iso or None, to_iso, order_int):
+                _plan_changed()
             return (True, None)
 
         if msg.startswith("wp_assign:"):
@@ -567,10 +619,9 @@ def on_js_msg(*args):
             did = _coerce_int(did_s)
             if did is None or not _valid_iso_date(iso):
                 return (True, None)
-            plan = _get_plan()
-            existing_count = sum(1 for row in plan if isinstance(row, dict) and row.get("iso") == iso)
-            next_plan = _rebuild_plan_with_move(plan, did, None, iso, existing_count)
-            _save_plan(next_plan)
+            index = _plan_index()
+            if index.move(did, None, iso, len(index.day(iso))):
+                _plan_changed()
             return (True, None)
 
         if msg.startswith("wp_remove:"):
@@ -581,9 +632,27 @@ def on_js_msg(*args):
             did = _coerce_int(did_s)
             if did is None or not _valid_iso_date(iso):
                 return (True, None)
-            plan = _get_plan()
-            next_plan = _rebuild_plan_without_entry(plan, did, iso)
-            _save_plan(next_plan)
+            if _plan_index().remove(did, iso):
+                _plan_changed()
+            return (True, None)
+
+        if msg.startswith("wp_decks:"):
+            # The page's cached catalog is missing or stale; ship the current one.
+            decks_hash, decks_js = _deck_catalog()
+            if msg.split(":", 1)[1] != decks_hash:
+                _deck_browser_eval(
+                    f"if (window.WP_setDecks) {{ window.WP_setDecks({decks_js}, {json.dumps(decks_hash)}); }}"
+                )
+            return (True, None)
+
+        if msg.startswith("wp_timing:"):
+            tooltip(f"Week Planner: {_LAST_INJECT_MS:.1f} ms in Python, "
+                    f"{msg.split(':', 1)[1]} ms to build the panel")
+            return (True, None)
+
+        if msg.startswith("wp_resync:"):
+            # The page missed a patch (or was reloaded); send it everything.
+            _broadcast_plan_to_web()
             return (True, None)
 
         # Optional: quick connectivity ping
@@ -598,19 +667,13 @@ def on_js_msg(*args):
     return handled if isinstance(handled, tuple) else (handled, None)
 
 def add_decks_to_today(deck_ids):
-    plan = _get_plan()
+    index = _plan_index()
     today = _iso_today()
-    existing = [row for row in plan if isinstance(row, dict) and row.get('iso') == today]
-    base_order = len(existing)
-    updated = list(plan)
-    offset = 0
+    changed = False
     for did in deck_ids:
-        if any(str(row.get('did')) == str(did) and row.get('iso') == today for row in plan if isinstance(row, dict)):
-            continue
-        updated.append({"did": int(did), "iso": today, "order": base_order + offset})
-        offset += 1
-    if offset:
-        _save_plan(updated)
+        changed = index.append(int(did), today) or changed
+    if changed:
+        _plan_changed()
         if getattr(mw, 'deckBrowser', None):
             try:
                 mw.deckBrowser.refresh()
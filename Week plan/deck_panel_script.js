@@ -1,12 +1,18 @@
-(function(){
+// Served once as a static web export (see deck_panel.py). Each deck browser
+// render then calls WP_init with the data only:
+//   WP_init({plan, version, decksHash, today, wrapArrows})
+window.WP_init = function(data) {
+  const initStarted = performance.now();
   const COLOR_SCHEME_MEDIA = window.matchMedia ? window.matchMedia('(prefers-color-scheme: dark)') : null;
   const isDarkMode = () => {
     const classFlag = document.body.classList.contains('night-mode') || document.body.classList.contains('nightMode');
     const mediaFlag = COLOR_SCHEME_MEDIA ? COLOR_SCHEME_MEDIA.matches : false;
     return classFlag || mediaFlag;
   };
-  const PLAN_RAW = __PLAN_JSON__;
-  const WRAP_ARROWS = __WRAP_ARROWS__;
+  const PLAN_RAW = data.plan;
+  let PLAN_VERSION = data.version;
+  const WRAP_ARROWS = !!data.wrapArrows;
+  const INCLUDE_CHILDREN = data.includeChildren !== false;
   let PLAN = [];
   if (Array.isArray(PLAN_RAW)) {
     PLAN = PLAN_RAW.map(function(row){
@@ -25,8 +31,23 @@
     }).filter(Boolean);
   }
   window.WP_PLAN = PLAN;
-  const DECKS = window.WP_DECKS = __DECKS_JSON__;
-  const TODAY_ISO = __TODAY_ISO__;
+  // The deck catalog is kept in localStorage and only shipped by Python when
+  // its hash differs from the copy this page holds.
+  const DECKS_HASH = data.decksHash;
+  const DECKS_STORAGE_KEY = 'wp-decks';
+  let DECKS = [];
+  let decksHash = '';
+  try {
+    const stored = JSON.parse(window.localStorage.getItem(DECKS_STORAGE_KEY) || 'null');
+    if (stored && stored.hash === DECKS_HASH && Array.isArray(stored.decks)) {
+      DECKS = stored.decks;
+      decksHash = stored.hash;
+    }
+  } catch (err) {
+    // storage unavailable or corrupt; ask Python below
+  }
+  window.WP_DECKS = DECKS;
+  const TODAY_ISO = data.today;
   const ensureStyle = () => {
     let st = document.getElementById('wp-style');
     if (!st) {
@@ -87,6 +108,7 @@
       .wp-day-controls .wp-btn{padding:2px 6px;border-radius:6px;}
       .cell-date{font-size:20px;font-weight:700;color:${textColor};}
       .cell-weekday{font-size:16px;font-weight:500;color:${muted};}
+      .cell-load{font-size:12px;color:${muted};padding-top:6px;min-height:16px;}
       .cell-list{display:flex;flex-direction:column;padding:0;margin-top:10px;gap:8px;flex:1;}
       .cell-item{padding:10px 14px;border:1px solid ${frameBorder};border-radius:12px;background:linear-gradient(180deg,${cardBgStart},${cardBgEnd});box-shadow:${cardShadow};cursor:pointer;user-select:none;font-size:15px;color:${textColor};position:relative;transition:background .12s, box-shadow .12s;outline:none;}
       .cell-item:focus{outline:none;}
@@ -136,25 +158,32 @@
 
   const deckIndex = new Map();
   const deckByName = new Map();
-  for (const deck of DECKS) {
-    if (deck && deck.id != null) {
-      const idStr = String(deck.id);
-      deckIndex.set(idStr, deck);
-      if (deck.name) {
-        const nameKey = String(deck.name).trim().toLowerCase();
-        if (nameKey) {
-          deckByName.set(nameKey, deck);
+  let deckOptions = [];
+
+  function indexDecks() {
+    deckIndex.clear();
+    deckByName.clear();
+    for (const deck of DECKS) {
+      if (deck && deck.id != null) {
+        const idStr = String(deck.id);
+        deckIndex.set(idStr, deck);
+        if (deck.name) {
+          const nameKey = String(deck.name).trim().toLowerCase();
+          if (nameKey) {
+            deckByName.set(nameKey, deck);
+          }
         }
       }
     }
+    deckOptions = Array.from(deckIndex.values()).sort(function(a, b) {
+      const nameA = (a && a.name ? String(a.name) : '').toLowerCase();
+      const nameB = (b && b.name ? String(b.name) : '').toLowerCase();
+      if (nameA < nameB) return -1;
+      if (nameA > nameB) return 1;
+      return 0;
+    });
   }
-  const deckOptions = Array.from(deckIndex.values()).sort(function(a, b) {
-    const nameA = (a && a.name ? String(a.name) : '').toLowerCase();
-    const nameB = (b && b.name ? String(b.name) : '').toLowerCase();
-    if (nameA < nameB) return -1;
-    if (nameA > nameB) return 1;
-    return 0;
-  });
+  indexDecks();
 
   const MAX_VISIBLE_DAYS = 5;
   const MIN_CELL_WIDTH = 220;
@@ -669,15 +698,19 @@
       }
 
       header.appendChild(controls);
+      const load = document.createElement('div');
+      load.className = 'cell-load';
       const list = document.createElement('div');
       list.className = 'cell-list';
 
       cell.appendChild(header);
+      cell.appendChild(load);
       cell.appendChild(list);
       plannerGrid.appendChild(cell);
 
       cells.set(iso, {
         cell: cell,
+        load: load,
         list: list
       });
     });
@@ -713,7 +746,44 @@
     WP_send('wp_open:' + did);
   }
 
+  // Per-deck counts from Python: {did: {iso: [due, new, learning]}}. Day
+  // totals are summed here, so moving a deck between days needs no round trip.
+  let WORKLOAD = {};
+
+  function renderWorkload() {
+    cells.forEach(function(info, iso) {
+      let due = 0, fresh = 0, learning = 0, known = false;
+      const rows = decksForIso(iso);
+      const names = rows.map(function(row) {
+        return row.deck && row.deck.name ? String(row.deck.name) : '';
+      });
+      rows.forEach(function(row, i) {
+        // A subdeck planned alongside its parent is already in the parent's counts.
+        if (INCLUDE_CHILDREN && names.some(function(name) {
+          return name && names[i].startsWith(name + '::');
+        })) {
+          return;
+        }
+        const counts = WORKLOAD[row.did] && WORKLOAD[row.did][iso];
+        if (!counts) return;
+        known = true;
+        due += counts[0];
+        fresh += counts[1];
+        learning += counts[2];
+      });
+      info.load.textContent = known ? `${due} due · ${fresh} new · ${learning} learning` : '';
+    });
+  }
+
+  window.WP_setWorkload = function(perDeck) {
+    for (const did of Object.keys(perDeck || {})) {
+      WORKLOAD[did] = Object.assign(WORKLOAD[did] || {}, perDeck[did]);
+    }
+    renderWorkload();
+  };
+
   function renderAssignments() {
+    renderWorkload();
     cells.forEach(function(info, iso) {
       info.list.innerHTML = '';
       const rows = decksForIso(iso);
@@ -730,8 +800,11 @@
     renderAssignments();
   }
 
-  window.WP_setPlan = function(nextPlan) {
+  window.WP_setPlan = function(nextPlan, version) {
     try {
+      if (Number.isFinite(version)) {
+        PLAN_VERSION = version;
+      }
       const normalized = Array.isArray(nextPlan) ? nextPlan.map(function(entry) {
         if (!entry || typeof entry !== 'object') {
           return null;
@@ -752,8 +825,58 @@
     }
   };
 
+  window.WP_setDecks = function(decks, hash) {
+    DECKS = Array.isArray(decks) ? decks : [];
+    decksHash = hash;
+    window.WP_DECKS = DECKS;
+    try {
+      window.localStorage.setItem(DECKS_STORAGE_KEY, JSON.stringify({ hash: hash, decks: DECKS }));
+    } catch (err) {
+      // storage full or unavailable; the catalog is simply requested again next time
+    }
+    indexDecks();
+    renderAssignments();
+  };
+
+  // Apply {from, to, ops} sent after each edit. Ops are ["del", did, iso] and
+  // ["ins", did, iso, position]; both are idempotent, so a patch confirming an
+  // edit this page already made locally leaves it unchanged. A patch that does
+  // not start at our version means one was missed: ask for a full snapshot.
+  window.WP_applyPatch = function(patch) {
+    try {
+      if (!patch || patch.from !== PLAN_VERSION) {
+        WP_send('wp_resync:' + PLAN_VERSION);
+        return;
+      }
+      const groups = groupFromList(PLAN);
+      for (const op of patch.ops || []) {
+        const did = String(op[1]);
+        const iso = op[2];
+        const bucket = (groups.get(iso) || []).slice().sort(function(a, b) {
+          return a.order - b.order;
+        }).filter(function(entry) {
+          return entry.did !== did;
+        });
+        if (op[0] === 'ins') {
+          bucket.splice(Math.min(Number(op[3]) || 0, bucket.length), 0, { did: did, order: 0 });
+        }
+        setBucket(groups, iso, bucket);
+      }
+      PLAN_VERSION = patch.to;
+      applyPlan(groups);
+    } catch (err) {
+      console.error('Week Planner applyPatch failed', err);
+    }
+  };
+
   STATE.anchorIso = TODAY_ISO;
   PLAN = rebuildPlan(groupFromList(PLAN));
   window.WP_PLAN = PLAN;
   renderWeekView();
-})();
+  if (decksHash !== DECKS_HASH) {
+    WP_send('wp_decks:' + decksHash);
+  }
+  if (data.timing) {
+    WP_send('wp_timing:' + (performance.now() - initStarted).toFixed(1));
+  }
+};
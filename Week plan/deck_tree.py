@@ -0,0 +1,52 @@
+# deck_tree.py , Parent -> children index of the deck tree, shared by Study Today and the workload overlay.
+from __future__ import annotations
+from typing import Dict, Iterable, List, Tuple
+
+from aqt import mw  # type: ignore
+
+
+class DeckHierarchy:
+    """Deck tree built once from (id, "A::B::C") pairs; descendants() is O(descendants)."""
+
+    def __init__(self, decks: Iterable[Tuple[int, str]]) -> None:
+        by_name = {name: did for did, name in decks}
+        self.children: Dict[int, List[int]] = {}
+        for name, did in by_name.items():
+            parent_name, sep, _ = name.rpartition("::")
+            if sep and parent_name in by_name:
+                self.children.setdefault(by_name[parent_name], []).append(did)
+
+    def descendants(self, did: int) -> List[int]:
+        """did followed by all decks below it."""
+        found = [did]
+        stack = [did]
+        while stack:
+            kids = self.children.get(stack.pop(), ())
+            found.extend(kids)
+            stack.extend(kids)
+        return found
+
+    def expand(self, dids: Iterable[int], include_children: bool) -> List[int]:
+        if not include_children:
+            return list(dict.fromkeys(dids))
+        seen: Dict[int, None] = {}
+        for did in dids:
+            if did not in seen:
+                seen.update(dict.fromkeys(self.descendants(did)))
+        return list(seen)
+
+
+_HIERARCHY: DeckHierarchy | None = None
+
+
+def deck_hierarchy() -> DeckHierarchy:
+    """The current collection's hierarchy, rebuilt only after deck tree changes."""
+    global _HIERARCHY
+    if _HIERARCHY is None:
+        _HIERARCHY = DeckHierarchy((d.id, d.name) for d in mw.col.decks.all_names_and_ids())
+    return _HIERARCHY
+
+
+def invalidate_deck_hierarchy() -> None:
+    global _HIERARCHY
+    _HIERARCHY = None
@@ -0,0 +1,188 @@
+# plan_index.py , In-memory plan index: ordered deck ids per day plus a (did, iso) membership set.
+#
+# Rows are validated once when loaded (deck_panel._migrate_plan); after that,
+# every edit only touches the day buckets involved, and those days are all the
+# store has to rewrite (see drain_touched). No Anki imports, so it can
+# be benchmarked on its own:  python plan_index.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+PlanEntry = Dict[str, Any]
+
+
+class PlanIndex:
+    """Plan as {iso: [did, ...]} in display order.
+
+    Mutations return whether anything changed, so callers never need to compare
+    whole plans, and bump `version` when they do. Each change is also journaled
+    as ["del", did, iso] / ["ins", did, iso, position] ops until `drain_ops`,
+    which is what gets sent to the panel instead of the whole plan, and the
+    days it touched are collected until `drain_touched` for the store.
+    """
+
+    def __init__(self) -> None:
+        self.days: Dict[str, List[int]] = {}
+        self.members: Set[Tuple[int, str]] = set()
+        self.version = 0
+        self.ops: List[list] = []
+        self.touched: Set[str] = set()
+        self._rows: List[PlanEntry] | None = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[PlanEntry]) -> "PlanIndex":
+        """Build from canonical rows (sorted by iso/order, no duplicates)."""
+        index = cls()
+        for row in rows:
+            did, iso = row["did"], row["iso"]
+            if (did, iso) in index.members:
+                continue
+            index.days.setdefault(iso, []).append(did)
+            index.members.add((did, iso))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self.members
+
+    def day(self, iso: str) -> List[int]:
+        return self.days.get(iso, [])
+
+    def rows(self) -> List[PlanEntry]:
+        """Canonical flat rows; cached until the next change."""
+        if self._rows is None:
+            self._rows = [
+                {"did": did, "iso": iso, "order": order}
+                for iso in sorted(self.days)
+                for order, did in enumerate(self.days[iso])
+            ]
+        return self._rows
+
+    def drain_ops(self) -> List[list]:
+        ops, self.ops = self.ops, []
+        return ops
+
+    def drain_touched(self) -> Dict[str, List[int]]:
+        """Changed days and their current decks (empty list = day cleared)."""
+        touched, self.touched = self.touched, set()
+        return {iso: list(self.days.get(iso, ())) for iso in sorted(touched)}
+
+    def _insert(self, did: int, iso: str, position: int) -> None:
+        bucket = self.days.setdefault(iso, [])
+        position = min(max(0, position), len(bucket))
+        bucket.insert(position, did)
+        self.members.add((did, iso))
+        self.ops.append(["ins", did, iso, position])
+        self.touched.add(iso)
+
+    def _changed(self) -> bool:
+        self.version += 1
+        self._rows = None
+        return True
+
+    def _discard(self, did: int, iso: str) -> bool:
+        if (did, iso) not in self.members:
+            return False
+        bucket = self.days[iso]
+        bucket.remove(did)
+        if not bucket:
+            del self.days[iso]
+        self.members.discard((did, iso))
+        self.ops.append(["del", did, iso])
+        self.touched.add(iso)
+        return True
+
+    def move(self, did: int, from_iso: str | None, to_iso: str, order: int) -> bool:
+        """Take did out of from_iso/to_iso and insert it into to_iso at order (clamped)."""
+        if from_iso == to_iso:
+            from_iso = None
+        mark = len(self.ops)
+        moved_day = from_iso is not None and self._discard(did, from_iso)
+        before = list(self.days.get(to_iso, ()))
+        self._discard(did, to_iso)
+        self._insert(did, to_iso, int(order))
+        if not moved_day and self.days[to_iso] == before:
+            del self.ops[mark:]
+            return False
+        return self._changed()
+
+    def append(self, did: int, iso: str) -> bool:
+        """Add did at the end of iso unless it is already planned there."""
+        if (did, iso) in self.members:
+            return False
+        self._insert(did, iso, len(self.days.get(iso, ())))
+        return self._changed()
+
+    def remove(self, did: int, iso: str) -> bool:
+        return self._discard(did, iso) and self._changed()
+
+    def set_day(self, iso: str, dids: Iterable[int]) -> bool:
+        """Replace a whole day, keeping the first occurrence of each deck."""
+        new: List[int] = []
+        for did in dids:
+            if did not in new:
+                new.append(did)
+        if self.days.get(iso, []) == new:
+            return False
+        for did in list(self.days.get(iso, ())):
+            self._discard(did, iso)
+        for position, did in enumerate(new):
+            self._insert(did, iso, position)
+        return self._changed()
+
+
+def _flat_move(plan: List[PlanEntry], did: int, from_iso: str | None, to_iso: str,
+               new_order: int) -> List[PlanEntry]:
+    """The previous per-edit approach: regroup, re-sort and renumber the whole list."""
+    per_iso: Dict[str, List[PlanEntry]] = {}
+    for row in plan:
+        if row["did"] == did and row["iso"] in (to_iso, from_iso):
+            continue
+        per_iso.setdefault(row["iso"], []).append({"did": row["did"], "iso": row["iso"], "order": int(row["order"])})
+    bucket = sorted(per_iso.get(to_iso, []), key=lambda r: (r["order"], r["did"]))
+    bucket.insert(min(new_order, len(bucket)), {"did": did, "iso": to_iso, "order": new_order})
+    per_iso[to_iso] = bucket
+    return [
+        {"did": row["did"], "iso": iso, "order": idx}
+        for iso in sorted(per_iso)
+        for idx, row in enumerate(sorted(per_iso[iso], key=lambda r: (r["order"], r["did"])))
+    ]
+
+
+def benchmark(sizes: Tuple[int, ...] = (1_000, 10_000, 50_000), days: int = 365) -> List[Tuple[int, float, float]]:
+    """Return (rows, flat rebuild us/edit, indexed us/edit) for random moves."""
+    import datetime
+    import random
+    import timeit
+
+    rng = random.Random(0)
+    base = datetime.date(2025, 1, 1)
+    isos = [(base + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    results = []
+    for size in sizes:
+        rows: List[PlanEntry] = []
+        for n in range(size):
+            rows.append({"did": n, "iso": isos[n % days], "order": n // days})
+        index = PlanIndex.from_rows(sorted(rows, key=lambda r: (r["iso"], r["order"])))
+        edits = [(rng.randrange(size), rng.choice(isos), rng.randrange(size // days + 1)) for _ in range(50)]
+        flat = sorted(rows, key=lambda r: (r["iso"], r["order"]))
+
+        def run_flat() -> None:
+            for did, iso, order in edits:
+                _flat_move(flat, did, None, iso, order)
+
+        def run_index() -> None:
+            for did, iso, order in edits:
+                index.move(did, None, iso, order)
+
+        flat_s = min(timeit.repeat(run_flat, number=1, repeat=3)) / len(edits)
+        index_s = min(timeit.repeat(run_index, number=20, repeat=3)) / (20 * len(edits))
+        results.append((size, flat_s * 1e6, index_s * 1e6))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} {'flat rebuild':>14} {'PlanIndex':>12}")
+    for size, flat_us, index_us in benchmark():
+        print(f"{size:>8} {flat_us:>11.0f} us {index_us:>9.1f} us")
@@ -0,0 +1,163 @@
+# plan_store.py , Date-indexed SQLite plan store with debounced background writes.
+#
+# The plan lives in user_files/plan.sqlite3, one row per (day, deck) keyed by
+# ISO date, so the panel loads only the days it shows and the cost of a load
+# does not grow with years of history. No Anki imports, so the windowed query
+# can be benchmarked on its own:  python plan_store.py
+from __future__ import annotations
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+PlanEntry = Dict[str, Any]
+Scheduler = Callable[[int, Callable[[], None]], None]
+
+SAVE_DELAY_MS = 300
+
+_SCHEMA = """
+create table if not exists plan (
+    iso text not null,
+    position integer not null,
+    did integer not null,
+    primary key (iso, did)
+) without rowid;
+create index if not exists plan_by_day on plan (iso, position);
+"""
+
+
+class PlanDB:
+    """Connection per thread; WAL lets the UI read while the writer commits."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path))
+            conn.execute("pragma journal_mode=wal")
+            conn.executescript(_SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def window(self, first_iso: str, last_iso: str) -> List[PlanEntry]:
+        """Rows for first_iso..last_iso inclusive, in iso/position order."""
+        rows = self.connection().execute(
+            "select did, iso, position from plan where iso between ? and ? order by iso, position",
+            (first_iso, last_iso),
+        )
+        return [{"did": did, "iso": iso, "order": order} for did, iso, order in rows]
+
+    def is_empty(self) -> bool:
+        return self.connection().execute("select 1 from plan limit 1").fetchone() is None
+
+    def replace_days(self, days: Dict[str, List[int]]) -> None:
+        """Rewrite whole days in one transaction; an empty list clears the day."""
+        conn = self.connection()
+        with conn:
+            for iso, dids in days.items():
+                conn.execute("delete from plan where iso = ?", (iso,))
+                conn.executemany(
+                    "insert or ignore into plan (iso, position, did) values (?, ?, ?)",
+                    ((iso, position, did) for position, did in enumerate(dids)),
+                )
+
+    def import_rows(self, rows: Iterable[PlanEntry]) -> None:
+        days: Dict[str, List[int]] = {}
+        for row in sorted(rows, key=lambda r: (r["iso"], r["order"])):
+            days.setdefault(row["iso"], []).append(row["did"])
+        self.replace_days(days)
+
+
+class PlanWriter:
+    """Debounced, ordered writer for changed plan days.
+
+    `save` merges the changed days into a pending batch and (re)arms a timer;
+    when edits stop for `delay` ms the batch is committed on a single worker
+    thread, so writes land in order and never block the UI. `flush` commits
+    anything outstanding synchronously (used on profile close).
+    """
+
+    def __init__(self, db: PlanDB, schedule: Scheduler, delay: int = SAVE_DELAY_MS) -> None:
+        self.db = db
+        self.schedule = schedule
+        self.delay = delay
+        self.generation = 0
+        self.pending: Dict[str, List[int]] = {}
+        self.last: Future | None = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="week-planner-save")
+
+    @property
+    def dirty(self) -> bool:
+        """True while the database may be older than the last saved plan."""
+        return bool(self.pending) or (self.last is not None and not self.last.done())
+
+    def save(self, days: Dict[str, List[int]]) -> None:
+        if not days:
+            return
+        self.pending.update({iso: list(dids) for iso, dids in days.items()})
+        self.generation += 1
+        generation = self.generation
+        self.schedule(self.delay, lambda: self._fire(generation))
+
+    def _fire(self, generation: int) -> None:
+        if generation == self.generation:
+            self._submit()
+
+    def _submit(self) -> None:
+        days, self.pending = self.pending, {}
+        if days:
+            self.last = self.executor.submit(self._write, days)
+
+    def _write(self, days: Dict[str, List[int]]) -> None:
+        try:
+            self.db.replace_days(days)
+        except Exception:
+            pass
+
+    def flush(self) -> None:
+        self.generation += 1
+        self._submit()
+        if self.last is not None:
+            self.last.result()
+
+
+def benchmark(years: Tuple[int, ...] = (1, 5, 20), per_day: int = 20,
+              window: int = 5) -> List[Tuple[int, float, float]]:
+    """Return (rows, full JSON load+filter ms, windowed query ms) for growing histories."""
+    import datetime
+    import json
+    import tempfile
+    import timeit
+
+    results = []
+    base = datetime.date(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        for span in years:
+            days = span * 365
+            rows = [
+                {"did": n, "iso": (base + datetime.timedelta(days=d)).isoformat(), "order": n}
+                for d in range(days) for n in range(per_day)
+            ]
+            db = PlanDB(Path(tmp) / f"plan-{span}.sqlite3")
+            db.import_rows(rows)
+            text = json.dumps(rows)
+            first = (base + datetime.timedelta(days=days // 2)).isoformat()
+            last = (base + datetime.timedelta(days=days // 2 + window - 1)).isoformat()
+
+            def load_json() -> None:
+                [r for r in json.loads(text) if first <= r["iso"] <= last]
+
+            json_s = min(timeit.repeat(load_json, number=3, repeat=3)) / 3
+            query_s = min(timeit.repeat(lambda: db.window(first, last), number=200, repeat=3)) / 200
+            results.append((len(rows), json_s * 1000, query_s * 1000))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'rows':>8} {'plan.json load':>15} {'window query':>13}")
+    for count, json_ms, query_ms in benchmark():
+        print(f"{count:>8} {json_ms:>12.2f} ms {query_ms:>10.3f} ms")
@@ -0,0 +1,144 @@
+# workload.py , Computes per-deck due/new/learning counts for the planner's visible days, off the UI thread.
+from __future__ import annotations
+import json
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from anki.utils import ids2str  # type: ignore
+from aqt import mw  # type: ignore
+from aqt.operations import QueryOp  # type: ignore
+
+from .deck_tree import DeckHierarchy
+
+Counts = Tuple[int, int, int]          # (due, new, learning)
+DayCounts = Dict[int, Tuple[int, int]]  # days from today -> (review, day-learning)
+
+# Today's counts, flattened from the deck browser's deck_due_tree snapshot.
+_TREE: Any = None
+_TREE_COUNTS: Dict[int, Counts] = {}
+# Future days per planned deck (subdecks included), from one GROUP BY per deck.
+_HISTOGRAMS: Dict[int, DayCounts] = {}
+_HISTOGRAM_DAY = -1
+_HISTOGRAM_CHILDREN = True  # include_children setting the histograms were built with
+_RUNNING = False
+_AGAIN: Tuple[Any, ...] | None = None
+
+
+def invalidate_workload(*_args: Any) -> None:
+    global _TREE, _TREE_COUNTS
+    _TREE, _TREE_COUNTS = None, {}
+    _HISTOGRAMS.clear()
+
+
+def on_operation_did_execute(changes: Any, handler: Any) -> None:
+    """Reviews, rescheduling and deck moves all change the counts."""
+    if getattr(changes, "card", False) or getattr(changes, "study_queues", False) \
+            or getattr(changes, "deck", False):
+        invalidate_workload()
+
+
+def _flatten_tree(node: Any, out: Dict[int, Counts], own: Dict[int, Counts]) -> None:
+    """Fill out with each deck's tree counts (subdecks included) and own with
+    the deck alone, approximated by subtracting the children's counts."""
+    for child in node.children:
+        counts = (child.review_count, child.new_count, child.learn_count)
+        out[child.deck_id] = counts
+        below = [(c.review_count, c.new_count, c.learn_count) for c in child.children]
+        own[child.deck_id] = tuple(
+            max(0, total - sum(kid[i] for kid in below)) for i, total in enumerate(counts)
+        )  # type: ignore[assignment]
+        _flatten_tree(child, out, own)
+
+
+def _histograms(col: Any, dids: Iterable[int], horizon: int, hierarchy: DeckHierarchy,
+                include_children: bool) -> Dict[int, DayCounts]:
+    """Review and day-learning cards due on each of the next horizon-1 days."""
+    owners: Dict[int, List[int]] = {}
+    result: Dict[int, DayCounts] = {}
+    for did in dids:
+        result[did] = {}
+        for child in hierarchy.expand((did,), include_children):
+            owners.setdefault(child, []).append(did)
+    if not owners or horizon < 2:
+        return result
+    today = col.sched.today
+    rows = col.db.all(
+        "select case when odid then odid else did end as home, "
+        "case when odid then odue else due end as day, queue, count() "
+        "from cards where queue in (2, 3) "
+        f"and (case when odid then odid else did end) in {ids2str(owners)} "
+        "and (case when odid then odue else due end) between ? and ? "
+        "group by home, day, queue",
+        today + 1,
+        today + horizon - 1,
+    )
+    for home, day, queue, count in rows:
+        for did in owners.get(home, ()):
+            review, learn = result[did].get(day - today, (0, 0))
+            if queue == 2:
+                review += count
+            else:
+                learn += count
+            result[did][day - today] = (review, learn)
+    return result
+
+
+def request_workload(planned: Dict[str, List[int]], isos: List[str], tree: Any,
+                     send: Callable[[str], Any], hierarchy: DeckHierarchy,
+                     include_children: bool) -> None:
+    """Compute counts for the planned decks in the background, then send them to the page.
+
+    planned maps each visible ISO day to its deck ids; isos[0] is today.
+    Results go out as WP_setWorkload({did: {iso: [due, new, learning]}}).
+    """
+    global _RUNNING, _AGAIN, _HISTOGRAM_DAY, _HISTOGRAM_CHILDREN
+    if _RUNNING:
+        _AGAIN = (planned, isos, tree, send, hierarchy, include_children)
+        return
+    if mw.col is None:
+        return
+    if mw.col.sched.today != _HISTOGRAM_DAY or include_children != _HISTOGRAM_CHILDREN:
+        invalidate_workload()
+        _HISTOGRAM_DAY = mw.col.sched.today
+        _HISTOGRAM_CHILDREN = include_children
+    dids = {did for ids in planned.values() for did in ids}
+    missing = [did for did in dids if did not in _HISTOGRAMS]
+    known_tree = _TREE if tree is None or tree is _TREE else None
+    counts = _TREE_COUNTS if known_tree is not None else None
+
+    def compute(col: Any) -> Tuple[Any, Dict[int, Counts], Dict[int, DayCounts]]:
+        snapshot = tree if tree is not None else known_tree
+        if snapshot is None:
+            snapshot = col.sched.deck_due_tree()
+        flat = counts
+        if flat is None:
+            totals: Dict[int, Counts] = {}
+            own: Dict[int, Counts] = {}
+            _flatten_tree(snapshot, totals, own)
+            flat = totals if include_children else own
+        return snapshot, flat, _histograms(col, missing, len(isos), hierarchy, include_children)
+
+    def on_done(result: Tuple[Any, Dict[int, Counts], Dict[int, DayCounts]]) -> None:
+        global _TREE, _TREE_COUNTS, _RUNNING, _AGAIN
+        _RUNNING = False
+        _TREE, _TREE_COUNTS = result[0], result[1]
+        _HISTOGRAMS.update(result[2])
+        payload: Dict[int, Dict[str, Counts]] = {}
+        for offset, iso in enumerate(isos):
+            for did in planned.get(iso, ()):
+                if offset == 0:
+                    value = _TREE_COUNTS.get(did, (0, 0, 0))
+                else:
+                    review, learn = _HISTOGRAMS.get(did, {}).get(offset, (0, 0))
+                    value = (review, 0, learn)
+                payload.setdefault(did, {})[iso] = value
+        send(f"if (window.WP_setWorkload) {{ window.WP_setWorkload({json.dumps(payload)}); }}")
+        if _AGAIN is not None:
+            pending, _AGAIN = _AGAIN, None
+            request_workload(*pending)
+
+    def on_failure(exc: Exception) -> None:
+        global _RUNNING, _AGAIN
+        _RUNNING, _AGAIN = False, None
+
+    _RUNNING = True
+    QueryOp(parent=mw, op=compute, success=on_done).failure(on_failure).run_in_background()